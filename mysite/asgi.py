@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Live results at /polls/<id>/results/stream/ are served outside the Django views.
+from polls.streaming import with_results_stream  # noqa: E402
+
+application = with_results_stream(django_application)
@@ -6,3 +6,7 @@ class PollsConfig(AppConfig):
     """For config polls."""
 
     name = 'polls'
+
+    def ready(self):
+        """Connect the model signal receivers."""
+        from . import signals  # noqa: F401
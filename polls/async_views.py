@@ -0,0 +1,90 @@
+"""Async versions of the poll views for running under ASGI."""
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import views
+from .middleware import counting_queries
+
+_executor = None
+
+
+def db_executor():
+    """
+    For get the thread pool that runs the database work of the async views.
+
+    :return: executor with POLLS_ASYNC_DB_THREADS threads, or None to use Django's single sync thread
+    """
+    global _executor
+    if settings.POLLS_ASYNC_DB_THREADS <= 0:
+        return None
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.POLLS_ASYNC_DB_THREADS,
+                                       thread_name_prefix='polls-db')
+    return _executor
+
+
+def _in_pool_thread(func, *args, **kwargs):
+    # Pool threads keep their connection between jobs like a request thread
+    # would, so the CONN_MAX_AGE rules apply to them too.
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_db(func, *args, **kwargs):
+    """
+    For run blocking ORM code without holding up the event loop.
+
+    :param func: sync callable to run
+    :return: result of func
+    """
+    executor = db_executor()
+    if executor is None:
+        return await sync_to_async(func)(*args, **kwargs)
+    # executor= needs asgiref 3.5 or later, see requirements.txt.
+    return await sync_to_async(_in_pool_thread, thread_sensitive=False, executor=executor)(func, *args, **kwargs)
+
+
+def _counted(view, request, *args, **kwargs):
+    # The middleware's context variable already reaches this thread; this is
+    # for a view called without the middleware, with the stats on the request.
+    stats = getattr(request, 'polls_query_stats', None)
+    if stats is None:
+        return view(request, *args, **kwargs)
+    with counting_queries(request, stats):
+        return view(request, *args, **kwargs)
+
+
+def pooled(view):
+    """
+    For make an async view out of a sync view.
+
+    The whole sync view (session and user loading, queries and rendering)
+    runs in the database pool, so many requests are served at once instead of
+    queueing for the one thread Django gives sync views under ASGI. The
+    hand-off to the pool costs a little latency per request, so this only
+    pays off under concurrent load; its queries still count in the
+    QueryInstrumentationMiddleware numbers.
+
+    :param view: sync view function
+    :return: async view function
+    """
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        return await run_db(_counted, view, request, *args, **kwargs)
+
+    return async_view
+
+
+index = pooled(views.IndexView.as_view())
+vote_for_poll = pooled(views.vote_for_poll)
+results = pooled(views.ResultsView.as_view())
+results_json = pooled(views.results_json)
+vote = pooled(views.vote)
+survey = pooled(views.survey_vote)
@@ -0,0 +1,34 @@
+"""Authentication backend that keeps session users in the cache."""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+def user_cache_key(user_id):
+    """
+    For name the cache entry of a user.
+
+    :param user_id:
+    :return: cache key
+    """
+    return f'polls:user:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    For load the user of a session without a query on every request.
+
+    Logging in still checks the password against the database; only get_user,
+    which AuthenticationMiddleware calls once per request, reads the cache.
+    Entries are dropped when the user is saved or deleted.
+    """
+
+    def get_user(self, user_id):
+        """Return the active user with user_id, from the cache when possible."""
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.POLLS_USER_CACHE_TIMEOUT)
+        return user
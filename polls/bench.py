@@ -0,0 +1,96 @@
+"""Helpers shared by the benchmark management commands."""
+import contextlib
+import math
+import os
+import tempfile
+
+from django.conf import settings
+from django.db import connection
+
+
+@contextlib.contextmanager
+def benchmark_database(keep=False):
+    """
+    For run a benchmark against a throwaway copy of the database.
+
+    SQLite gets a file instead of the in-memory test database, so several
+    threads can read and write it like they would in production.
+
+    :param keep: keep the database after the benchmark
+    """
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    temp_dir = None
+    if connection.vendor == 'sqlite' and not old_test_name:
+        temp_dir = tempfile.mkdtemp(prefix='pollbench-')
+        test_settings['NAME'] = os.path.join(temp_dir, 'bench.sqlite3')
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        if not keep:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            if temp_dir is not None:
+                with contextlib.suppress(OSError):
+                    os.rmdir(temp_dir)
+        test_settings['NAME'] = old_test_name
+
+
+def database_profile():
+    """
+    For describe the database, session and authentication setup a benchmark ran with.
+
+    :return: dict of the backend, persistent connection age, SQLite tuning, session engine and auth backends
+    """
+    profile = {
+        'vendor': connection.vendor,
+        'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+        'session_engine': settings.SESSION_ENGINE,
+        'auth_backends': list(settings.AUTHENTICATION_BACKENDS),
+    }
+    if connection.vendor == 'sqlite':
+        profile['pragmas'] = settings.POLLS_SQLITE_PRAGMAS
+    return profile
+
+
+def percentile(values, pct):
+    """
+    For get a percentile of the values by the nearest-rank method.
+
+    :param values: sorted list of numbers
+    :param pct: percentile from 0 to 100
+    :return: value at the percentile, or 0.0 for an empty list
+    """
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[rank - 1]
+
+
+def summarize(latencies, elapsed, errors=0, queries=None):
+    """
+    For sum up one benchmark run.
+
+    :param latencies: seconds taken by each request
+    :param elapsed: wall clock seconds of the whole run
+    :param errors: number of failed requests
+    :param queries: number of queries of each request, if counted
+    :return: dict of the throughput, latency percentiles (ms) and queries per request
+    """
+    latencies = sorted(latencies)
+    summary = {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'latency_ms': {
+            'mean': round(1000 * sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            'p50': round(1000 * percentile(latencies, 50), 3),
+            'p95': round(1000 * percentile(latencies, 95), 3),
+            'p99': round(1000 * percentile(latencies, 99), 3),
+            'max': round(1000 * latencies[-1], 3) if latencies else 0.0,
+        },
+    }
+    if queries is not None:
+        summary['queries_per_request'] = round(sum(queries) / len(queries), 2) if queries else 0.0
+    return summary
@@ -0,0 +1,125 @@
+"""Cache the published question pages until the next poll opens or closes."""
+import datetime
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import BooleanField, ExpressionWrapper, Min, Q
+from django.utils import timezone
+
+from .metrics import cache_requests
+from .models import Question
+
+GENERATION_KEY = 'polls:index:generation'
+CURSOR_FORMAT = '%Y%m%d%H%M%S%f'
+
+
+def make_cursor(question):
+    """
+    For point the next page after question.
+
+    :param question:
+    :return: cursor string of the pub_date and id of question
+    """
+    pub_date = question.pub_date.astimezone(datetime.timezone.utc)
+    return f"{pub_date.strftime(CURSOR_FORMAT)}.{question.id}"
+
+
+def parse_cursor(cursor):
+    """
+    For read a cursor made by make_cursor.
+
+    :param cursor:
+    :return: (pub_date, id) tuple
+    :raise ValueError: if the cursor is malformed
+    """
+    stamp, _, question_id = cursor.partition('.')
+    pub_date = datetime.datetime.strptime(stamp, CURSOR_FORMAT).replace(tzinfo=datetime.timezone.utc)
+    return pub_date, int(question_id)
+
+
+def published_questions(cursor=None, open_only=False):
+    """
+    For get one page of the published questions, newest first, from the cache when possible.
+
+    Pages are keyed on the (pub_date, id) of the last question of the previous
+    page instead of an offset, so every page is a short range scan of the index.
+
+    :param cursor: cursor of the previous page, None for the first page
+    :param open_only: only the questions that can be voted now
+    :return: (list of questions, cursor of the next page or None)
+    :raise ValueError: if the cursor is malformed
+    """
+    position = parse_cursor(cursor) if cursor else None
+    generation = index_generation()
+    key = f'polls:index:{generation}:{int(open_only)}:{cursor or ""}'
+    page = cache.get(key)
+    cache_requests.inc(cache='index', result='miss' if page is None else 'hit')
+    if page is None:
+        now = timezone.now()
+        # Right after a change the replicas may not have it yet, and a page read
+        # from them would be cached under the new generation; read the primary.
+        recent = time.time_ns() - generation < settings.POLLS_REPLICA_STICKY_SECONDS * 1e9
+        using = 'default' if recent else None
+        page = _read_page(now, position, open_only, using)
+        cache.set(key, page, index_timeout(now, using))
+    return page
+
+
+def _read_page(now, position, open_only, using=None):
+    questions = Question.objects.db_manager(using).filter(pub_date__lte=now).annotate(
+        is_open=ExpressionWrapper(Q(end_date__gte=now), output_field=BooleanField()),
+    )
+    if open_only:
+        questions = questions.filter(end_date__gte=now)
+    if position is not None:
+        pub_date, question_id = position
+        questions = questions.filter(Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=question_id))
+    size = settings.POLLS_INDEX_PAGE_SIZE
+    rows = list(questions.order_by('-pub_date', '-id')[:size + 1])
+    if len(rows) > size:
+        return rows[:size], make_cursor(rows[size - 1])
+    return rows, None
+
+
+def index_timeout(now, using=None):
+    """
+    For know how long the question pages stay correct.
+
+    The pages change when a question gets published and the vote buttons
+    change when a question closes, so the entries must expire at the next of
+    those moments.
+
+    :param now: time the pages were read
+    :param using: database to read the dates from, default the routed one
+    :return: timeout in seconds
+    """
+    boundaries = Question.objects.db_manager(using).aggregate(
+        next_open=Min('pub_date', filter=Q(pub_date__gt=now)),
+        next_close=Min('end_date', filter=Q(end_date__gte=now, pub_date__lte=now)),
+    )
+    timeout = settings.POLLS_INDEX_CACHE_TIMEOUT
+    for boundary in boundaries.values():
+        if boundary is not None:
+            timeout = min(timeout, math.ceil((boundary - now).total_seconds()) or 1)
+    return timeout
+
+
+def index_generation():
+    """
+    For get the generation that the cached pages are keyed on.
+
+    :return: generation number, changed by invalidate_index
+    """
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        generation = time.time_ns()
+        cache.add(GENERATION_KEY, generation, None)
+        generation = cache.get(GENERATION_KEY, generation)
+    return generation
+
+
+def invalidate_index():
+    """For drop every cached question page after a question or choice changed."""
+    cache.set(GENERATION_KEY, time.time_ns(), None)
@@ -0,0 +1,25 @@
+"""Find the address of the client behind the trusted proxies."""
+from django.conf import settings
+
+
+def get_client_ip(request):
+    """
+    For get the address of the client that sent request.
+
+    X-Forwarded-For is only believed when the request came from one of
+    POLLS_TRUSTED_PROXIES. Its addresses are then read from the right, past
+    the trusted proxies, so a client cannot pick its address by sending the
+    header itself.
+
+    :param request:
+    :return: IP address
+    """
+    remote = request.META.get('REMOTE_ADDR')
+    trusted = settings.POLLS_TRUSTED_PROXIES
+    if remote not in trusted:
+        return remote
+    forwarded = [address.strip() for address in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')]
+    for address in reversed(forwarded):
+        if address and address not in trusted:
+            return address
+    return remote
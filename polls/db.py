@@ -0,0 +1,42 @@
+"""Database connection tuning and health checks."""
+import time
+
+from django.conf import settings
+from django.db import connections
+
+
+def tune_sqlite(connection):
+    """
+    For apply POLLS_SQLITE_PRAGMAS to a new SQLite connection.
+
+    WAL lets readers run while a vote is written, synchronous=NORMAL drops the
+    fsync of every commit (WAL keeps the database consistent) and busy_timeout
+    makes a writer wait for the lock instead of failing with "database is locked".
+
+    :param connection: Django database wrapper
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.POLLS_SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def check_connections():
+    """
+    For drop persistent connections that went bad while idle.
+
+    Django only tests a connection after an error, so a connection the server
+    closed while idle would fail the next request. Every
+    POLLS_DB_HEALTH_CHECK_INTERVAL seconds a request first pings it instead.
+    """
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is None or connection.settings_dict['CONN_MAX_AGE'] == 0:
+            continue
+        checked_at = getattr(connection, 'polls_checked_at', 0)
+        if now - checked_at < settings.POLLS_DB_HEALTH_CHECK_INTERVAL:
+            continue
+        connection.polls_checked_at = now
+        if not connection.is_usable():
+            connection.close()
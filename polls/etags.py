@@ -0,0 +1,104 @@
+"""ETag and Last-Modified of the poll pages, for answering repeat requests with 304."""
+import datetime
+import hashlib
+import time
+
+from django.contrib import messages
+from django.core.cache import cache
+
+from .cache import index_generation
+from .models import Question
+from .schedule import schedule
+
+RESULTS_STAMP_KEY = 'polls:results:stamp:{}'
+
+
+def question_for(request, pk):
+    """
+    For read the question of a results request once, for both its validators and the page.
+
+    :param request:
+    :param pk:
+    :return: Question, or None if there is no such question
+    """
+    if getattr(request, 'polls_question', None) is None or request.polls_question.pk != pk:
+        request.polls_question = Question.objects.filter(pk=pk).first()
+    return request.polls_question
+
+
+def results_stamp(question_id):
+    """
+    For get the time of the last committed vote on a question, kept in the cache.
+
+    Votes move it once their transaction commits (see move_results_stamps), so
+    reading it costs no query and voters never queue on the question row. When
+    the cache lost it the current time is stored, which can only make clients
+    fetch the results once more.
+
+    :param question_id:
+    :return: POSIX timestamp
+    """
+    key = RESULTS_STAMP_KEY.format(question_id)
+    stamp = cache.get(key)
+    if stamp is None:
+        cache.add(key, time.time(), None)
+        stamp = cache.get(key, time.time())
+    return stamp
+
+
+def move_results_stamps(question_ids):
+    """
+    For mark the results of questions as changed by committed votes.
+
+    :param question_ids:
+    """
+    now = time.time()
+    cache.set_many({RESULTS_STAMP_KEY.format(question_id): now for question_id in question_ids}, None)
+
+
+def results_etag(request, pk):
+    """
+    For tag the results of a question with its last edit and its last vote.
+
+    Edits, rebuildtallies and compactcounters move Question.modified, votes
+    move the stamp, so a 304 needs the question row and one cache read, never
+    the tallies.
+
+    :param request:
+    :param pk:
+    :return: ETag, or None if there is no such question
+    """
+    question = question_for(request, pk)
+    if question is None:
+        return None
+    return f'{question.pk}.{question.modified.timestamp():.6f}.{results_stamp(question.pk):.6f}'
+
+
+def results_last_modified(request, pk):
+    """
+    For get the later of the last edit and the last vote of a question.
+
+    :param request:
+    :param pk:
+    :return: datetime, or None if there is no such question
+    """
+    question = question_for(request, pk)
+    if question is None:
+        return None
+    voted = datetime.datetime.fromtimestamp(results_stamp(question.pk), datetime.timezone.utc)
+    return max(question.modified, voted)
+
+
+def index_etag(request):
+    """
+    For tag an index page with the cache generation, the user and the page asked for.
+
+    :param request:
+    :return: ETag, or None when a message is waiting to be shown on the page
+    """
+    if len(messages.get_messages(request)):
+        return None
+    # Let transitions that became due move the generation before it is read.
+    schedule.open_ids()
+    key = f"{index_generation()}:{request.user.pk}:{request.GET.get('after', '')}:{bool(request.GET.get('open'))}"
+    return hashlib.md5(key.encode()).hexdigest()
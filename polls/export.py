@@ -0,0 +1,87 @@
+"""Stream polls, tallies and votes as CSV or JSON lines."""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Question, Vote
+
+POLL_FIELDS = ('question_id', 'question_text', 'pub_date', 'end_date', 'choice_id', 'choice_text', 'votes')
+VOTE_FIELDS = ('vote_id', 'question_id', 'choice_id', 'user_id')
+FORMATS = ('csv', 'jsonl')
+CHUNK_SIZE = 2000
+
+
+def poll_rows(using=None):
+    """
+    For read every question with its choices and their tallies, one row per choice.
+
+    Rows are read with a server-side iterator, so memory stays flat however
+    large the archive is. Questions without choices give one row with empty
+    choice fields.
+
+    :param using: database alias to read from, or None to let the router pick
+    :return: generator of tuples in POLL_FIELDS order
+    """
+    return Question.objects.using(using).order_by('id', 'choice__id').values_list(
+        'id', 'question_text', 'pub_date', 'end_date', 'choice__id', 'choice__choice_text',
+    ).annotate(
+        votes=F('choice__vote_count') + Coalesce(Sum('choice__shards__count'), 0),
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+def vote_rows(using=None):
+    """
+    For read every vote.
+
+    :param using: database alias to read from, or None to let the router pick
+    :return: generator of tuples in VOTE_FIELDS order
+    """
+    return Vote.objects.using(using).order_by('id').values_list(
+        'id', 'question_id', 'choice_id', 'user_id',
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+class _Line:
+    """For let csv.writer hand back the line it wrote instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def as_csv(fields, rows):
+    """
+    For encode rows as CSV, header first.
+
+    :return: generator of CSV lines
+    """
+    writer = csv.writer(_Line())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def as_jsonl(fields, rows):
+    """
+    For encode rows as one JSON object per line.
+
+    :return: generator of JSON lines
+    """
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def export_lines(fmt='csv', votes=False, using=None):
+    """
+    For stream the polls (or the raw votes) in the given format.
+
+    :param fmt: 'csv' or 'jsonl'
+    :param votes: export the Vote rows instead of the per-choice tallies
+    :param using: database alias to read from, or None to let the router pick
+    :return: generator of text lines
+    """
+    fields, rows = (VOTE_FIELDS, vote_rows(using)) if votes else (POLL_FIELDS, poll_rows(using))
+    encode = as_jsonl if fmt == 'jsonl' else as_csv
+    return encode(fields, rows)
@@ -0,0 +1,130 @@
+"""Write-behind queue that batches votes instead of writing each one in the request."""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+
+from .votes import apply_votes
+
+logger = logging.getLogger("polls")
+
+
+class VoteQueue:
+    """
+    For collect votes in memory and flush them to the database in batches.
+
+    Votes are coalesced by (question, user) so only the last choice of a user
+    is written. A background thread flushes when the batch is full or when the
+    oldest pending vote has waited POLLS_VOTE_BATCH_DELAY seconds.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._in_flight = {}
+        self._first_pending_at = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread = None
+
+    def put(self, question_id, user_id, choice_id):
+        """
+        Queue the vote of user on question.
+
+        :param question_id:
+        :param user_id:
+        :param choice_id: choice already checked to belong to question
+        """
+        self._ensure_thread()
+        with self._lock:
+            if not self._pending:
+                self._first_pending_at = time.monotonic()
+                self._wakeup.notify()
+            self._pending[question_id, user_id] = choice_id
+            if len(self._pending) >= settings.POLLS_VOTE_BATCH_SIZE:
+                self._wakeup.notify()
+
+    def pending_choice(self, question_id, user_id):
+        """
+        For read a vote that is queued but may not be in the database yet.
+
+        :return: choice id, or None if the user has no vote waiting
+        """
+        with self._lock:
+            key = (question_id, user_id)
+            return self._pending.get(key, self._in_flight.get(key))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """
+        Write every queued vote in one transaction.
+
+        :return: number of votes written
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._first_pending_at = None
+                self._in_flight = batch
+            if not batch:
+                return 0
+            try:
+                self._apply(batch)
+            finally:
+                with self._lock:
+                    self._in_flight = {}
+            return len(batch)
+
+    def _apply(self, batch):
+        try:
+            apply_votes(batch)
+        except DatabaseError:
+            # One bad vote (e.g. its choice was deleted meanwhile) must not drop the batch.
+            logger.exception("Batched vote flush failed, retrying votes one by one")
+            for key, choice_id in batch.items():
+                try:
+                    apply_votes({key: choice_id})
+                except DatabaseError:
+                    logger.error(f"Dropped queued vote of user {key[1]} on question {key[0]}")
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="polls-vote-flusher", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._due():
+                    self._wakeup.wait(self._wait_time())
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Vote flusher failed")
+            close_old_connections()
+
+    def _due(self):
+        if not self._pending:
+            return False
+        if len(self._pending) >= settings.POLLS_VOTE_BATCH_SIZE:
+            return True
+        return time.monotonic() - self._first_pending_at >= settings.POLLS_VOTE_BATCH_DELAY
+
+    def _wait_time(self):
+        if not self._pending:
+            return None
+        return max(0.0, settings.POLLS_VOTE_BATCH_DELAY - (time.monotonic() - self._first_pending_at))
+
+
+vote_queue = VoteQueue()
@@ -0,0 +1,147 @@
+"""Compare the sync and async view stacks under concurrent ASGI load."""
+import asyncio
+import datetime
+import importlib
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import clear_url_caches, reverse
+from django.utils import timezone
+
+from polls.bench import benchmark_database, summarize
+from polls.models import Question, Choice
+
+SCENARIOS = ('index', 'detail', 'results', 'vote')
+
+
+class Command(BaseCommand):
+    """For measure requests per second and latency of the poll views served over ASGI."""
+
+    help = "Drive the poll views concurrently through the ASGI application with the sync and async view stacks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stack', choices=('sync', 'async', 'both'), default='both')
+        parser.add_argument('--requests', type=int, default=500, help="Requests per scenario.")
+        parser.add_argument('--concurrency', type=int, default=50, help="Clients sending at the same time.")
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                            help="Scenario to run, may be repeated (default: all).")
+        parser.add_argument('--output', help="Write the report as JSON to this file.")
+
+    def handle(self, *args, **options):
+        stacks = ('sync', 'async') if options['stack'] == 'both' else (options['stack'],)
+        scenarios = options['scenario'] or SCENARIOS
+        report = {'concurrency': options['concurrency'], 'db_threads': settings.POLLS_ASYNC_DB_THREADS,
+                  'stacks': {}}
+        with benchmark_database(), override_settings(ALLOWED_HOSTS=['testserver'], POLLS_THROTTLE_ENABLED=False):
+            question, clients = self.seed(options['concurrency'])
+            for stack in stacks:
+                with override_settings(POLLS_VIEW_STACK=stack):
+                    application = load_application()
+                    report['stacks'][stack] = {
+                        scenario: asyncio.run(self.run_scenario(
+                            application, scenario, question, clients, options['requests']))
+                        for scenario in scenarios
+                    }
+        load_application()
+        for stack, results in report['stacks'].items():
+            for scenario, summary in results.items():
+                latency = summary['latency_ms']
+                self.stdout.write(f"{stack:5} {scenario:8} {summary['throughput_rps']:>9} req/s  "
+                                  f"p50 {latency['p50']:>8} ms  p99 {latency['p99']:>8} ms  "
+                                  f"errors {summary['errors']}")
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+
+    def seed(self, count):
+        """Create an open poll and one logged-in client per concurrent user."""
+        now = timezone.now()
+        question = Question.objects.create(question_text="Benchmark poll", pub_date=now - datetime.timedelta(days=1),
+                                           end_date=now + datetime.timedelta(days=1))
+        Choice.objects.bulk_create(Choice(question=question, choice_text=f"Choice {i}") for i in range(5))
+        question.choice_ids = list(question.choice_set.values_list('id', flat=True))
+        clients = []
+        for i in range(count):
+            user = User.objects.create_user(username=f'asgibench{i}')
+            client = Client()
+            client.force_login(user)
+            client.get(reverse('polls:detail', args=(question.id,)))
+            clients.append(client.cookies)
+        return question, clients
+
+    async def run_scenario(self, application, scenario, question, clients, total):
+        """Send total requests of scenario, spread over the clients."""
+        choice_ids = question.choice_ids
+        latencies, errors = [], 0
+
+        async def client_loop(index, cookies):
+            nonlocal errors
+            for n in range(index, total, len(clients)):
+                method, path, body = request_for(scenario, question.id, choice_ids[n % len(choice_ids)])
+                started = time.perf_counter()
+                status = await asgi_request(application, method, path, cookies, body)
+                latencies.append(time.perf_counter() - started)
+                if status >= 400:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(i, cookies) for i, cookies in enumerate(clients)))
+        return summarize(latencies, time.perf_counter() - started, errors)
+
+
+def load_application():
+    """Build a fresh ASGI application so the URLconf picks up POLLS_VIEW_STACK."""
+    import polls.urls
+    import mysite.urls
+    importlib.reload(polls.urls)
+    importlib.reload(mysite.urls)
+    clear_url_caches()
+    from django.core.asgi import get_asgi_application
+    return get_asgi_application()
+
+
+def request_for(scenario, question_id, choice_id):
+    """Return (method, path, body) of one request of scenario."""
+    if scenario == 'index':
+        return 'GET', reverse('polls:index'), b''
+    if scenario == 'detail':
+        return 'GET', reverse('polls:detail', args=(question_id,)), b''
+    if scenario == 'results':
+        return 'GET', reverse('polls:results', args=(question_id,)), b''
+    return 'POST', reverse('polls:vote', args=(question_id,)), f'choice={choice_id}'.encode()
+
+
+async def asgi_request(application, method, path, cookies, body):
+    """Send one request straight to the ASGI application and return the response status."""
+    cookie_header = '; '.join(f'{key}={morsel.value}' for key, morsel in cookies.items())
+    headers = [(b'host', b'testserver'), (b'cookie', cookie_header.encode())]
+    if method == 'POST':
+        headers += [(b'content-type', b'application/x-www-form-urlencoded'),
+                    (b'x-csrftoken', cookies[settings.CSRF_COOKIE_NAME].value.encode())]
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+        'root_path': '', 'headers': headers, 'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    disconnected = asyncio.Event()
+    status = 500
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await application(scope, receive, send)
+    disconnected.set()
+    return status
@@ -0,0 +1,13 @@
+"""Fold the counter shards of busy polls into the choice tallies."""
+from django.core.management.base import BaseCommand
+
+from polls.votes import compact_counters
+
+
+class Command(BaseCommand):
+    """For keep the sum over counter shards short, run periodically e.g. from cron."""
+
+    help = "Fold ChoiceShard counts into Choice.vote_count."
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Compacted the counters of {compact_counters()} choices.")
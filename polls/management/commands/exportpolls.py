@@ -0,0 +1,26 @@
+"""Export the polls with their tallies, or the raw votes."""
+from django.core.management.base import BaseCommand
+
+from polls.export import FORMATS, export_lines
+
+
+class Command(BaseCommand):
+    """For write the polls archive as CSV or JSON lines."""
+
+    help = "Stream questions, choices and tallies (or raw votes with --votes) as CSV or JSON lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--votes', action='store_true', help="Export the Vote rows instead of the tallies.")
+        parser.add_argument('--output', '-o', help="File to write, default standard output.")
+        parser.add_argument('--database', default='default',
+                            help="Database to read from, e.g. a read replica such as replica1.")
+
+    def handle(self, *args, **options):
+        lines = export_lines(options['format'], options['votes'], options['database'])
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,28 @@
+"""Freeze the results of closed polls."""
+from django.core.management.base import BaseCommand
+
+from polls.snapshots import closed_questions, finalize, purge_votes
+
+
+class Command(BaseCommand):
+    """For snapshot every closed poll, and optionally drop its Vote rows."""
+
+    help = "Freeze the results of polls closed past POLLS_FINALIZE_GRACE into snapshots."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--purge-votes', action='store_true',
+                            help="Delete the Vote rows of finalized polls (export them first with "
+                                 "exportpolls --votes to keep an archive).")
+
+    def handle(self, *args, **options):
+        finalized = purged = 0
+        for question in closed_questions().select_related('snapshot').iterator():
+            snapshot = getattr(question, 'snapshot', None)
+            if snapshot is None or snapshot.question_modified != question.modified:
+                finalize(question)
+                finalized += 1
+            if options['purge_votes'] and not (snapshot is not None and snapshot.votes_purged):
+                purged += purge_votes(question)
+        self.stdout.write(f"Finalized {finalized} polls.")
+        if options['purge_votes']:
+            self.stdout.write(f"Purged {purged} votes.")
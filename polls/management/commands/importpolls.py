@@ -0,0 +1,114 @@
+"""Import questions and choices in bulk from CSV or JSON lines."""
+import csv
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from polls.cache import invalidate_index
+from polls.models import Question, Choice
+from polls.schedule import schedule
+
+
+class Command(BaseCommand):
+    """For create many questions and their choices at once."""
+
+    help = ("Import questions from CSV (question_text,pub_date,end_date,choices with choices separated by '|') "
+            "or JSON lines ({\"question_text\", \"pub_date\", \"end_date\", \"choices\": [...]}).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=('csv', 'jsonl'),
+                            help="Input format, guessed from the file extension by default.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Questions per transaction.")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or ('jsonl' if os.path.splitext(options['path'])[1] in ('.jsonl', '.json') else 'csv')
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        questions = choices = 0
+        with open(options['path'], newline='') as source:
+            records = read_csv(source) if fmt == 'csv' else read_jsonl(source)
+            batch = []
+            for line, record in records:
+                batch.append(parse_record(line, record))
+                if len(batch) >= options['batch_size']:
+                    choices += save_batch(batch)
+                    questions += len(batch)
+                    batch = []
+            if batch:
+                choices += save_batch(batch)
+                questions += len(batch)
+        # bulk_create sends no post_save signal
+        invalidate_index()
+        schedule.reset()
+        self.stdout.write(f"Imported {questions} questions and {choices} choices.")
+
+
+def read_csv(source):
+    """Yield (line number, record) for each CSV row."""
+    reader = csv.DictReader(source)
+    for row in reader:
+        choices = row.get('choices') or ''
+        yield reader.line_num, {
+            'question_text': row.get('question_text'),
+            'pub_date': row.get('pub_date'),
+            'end_date': row.get('end_date'),
+            'choices': [choice for choice in choices.split('|') if choice],
+        }
+
+
+def read_jsonl(source):
+    """Yield (line number, record) for each JSON line."""
+    for number, text in enumerate(source, 1):
+        if not text.strip():
+            continue
+        try:
+            yield number, json.loads(text)
+        except ValueError as error:
+            raise CommandError(f"Line {number}: invalid JSON ({error}).")
+
+
+def parse_record(line, record):
+    """
+    For turn one record into an unsaved question and its choice texts.
+
+    :raise CommandError: if a field is missing or malformed
+    """
+    text = record.get('question_text')
+    if not text:
+        raise CommandError(f"Line {line}: question_text is required.")
+    dates = {}
+    for field in ('pub_date', 'end_date'):
+        value = record.get(field)
+        parsed = parse_datetime(value) if isinstance(value, str) else None
+        if parsed is None:
+            raise CommandError(f"Line {line}: {field} must be an ISO date and time, got {value!r}.")
+        dates[field] = parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+    choices = record.get('choices') or []
+    if not isinstance(choices, list):
+        raise CommandError(f"Line {line}: choices must be a list.")
+    return Question(question_text=text[:200], **dates), [str(choice)[:200] for choice in choices]
+
+
+def save_batch(batch):
+    """
+    For save a batch of questions and their choices in one transaction.
+
+    :param batch: list of (unsaved question, choice texts)
+    :return: number of choices created
+    """
+    with transaction.atomic():
+        questions = [question for question, _ in batch]
+        if connection.features.can_return_rows_from_bulk_insert:
+            Question.objects.bulk_create(questions)
+        else:
+            # Without RETURNING (SQLite on Django 3.1) the new ids are only known one insert at a time.
+            for question in questions:
+                question.save(force_insert=True)
+        choices = [Choice(question=question, choice_text=text) for question, texts in batch for text in texts]
+        Choice.objects.bulk_create(choices, batch_size=1000)
+    return len(choices)
@@ -0,0 +1,199 @@
+"""Benchmark the index, detail, vote and results hot paths."""
+import datetime
+import json
+import random
+import subprocess
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from polls.bench import benchmark_database, database_profile, summarize
+from polls.models import Question, Choice, Vote
+from polls.schedule import schedule
+
+SCENARIOS = ('index', 'detail', 'vote', 'results')
+CHOICES_PER_QUESTION = 4
+
+
+class Command(BaseCommand):
+    """For measure throughput, latency and queries per request of the poll views."""
+
+    help = "Seed users, questions and votes, then drive the poll views and report their cost."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--questions', type=int, default=50)
+        parser.add_argument('--votes', type=int, default=5000)
+        parser.add_argument('--requests', type=int, default=200, help="Requests per scenario.")
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                            help="Scenario to run, may be repeated (default: all).")
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help="Threads sending requests at the same time, each with its own connection.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, for comparable runs.")
+        parser.add_argument('--output', help="Write the report as JSON to this file.")
+        parser.add_argument('--compare', help="JSON report of an earlier run to compare against.")
+        parser.add_argument('--in-place', action='store_true',
+                            help="Use the configured database instead of a throwaway copy.")
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['questions'] < 1:
+            raise CommandError("--users and --questions must be at least 1.")
+        self.random = random.Random(options['seed'])
+        if options['in_place']:
+            report = self.run(options)
+        else:
+            with benchmark_database():
+                report = self.run(options)
+        for scenario, summary in report['scenarios'].items():
+            latency = summary['latency_ms']
+            self.stdout.write(f"{scenario:8} {summary['throughput_rps']:>9} req/s  p50 {latency['p50']:>8} ms  "
+                              f"p95 {latency['p95']:>8} ms  p99 {latency['p99']:>8} ms  "
+                              f"{summary['queries_per_request']:>6} queries/req  errors {summary['errors']}")
+        if options['compare']:
+            self.compare(report, options['compare'])
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+
+    def run(self, options):
+        """Seed the data and run every scenario."""
+        with override_settings(ALLOWED_HOSTS=['testserver'], POLLS_THROTTLE_ENABLED=False):
+            seeded = self.seed(options['users'], options['questions'], options['votes'])
+            cache.clear()
+            schedule.reset()
+            scenarios = options['scenario'] or SCENARIOS
+            return {
+                'commit': current_commit(),
+                'database': connection.vendor,
+                'profile': database_profile(),
+                'seed': seeded,
+                'concurrency': options['concurrency'],
+                'scenarios': {scenario: self.drive(scenario, options['requests'], options['concurrency'])
+                              for scenario in scenarios},
+            }
+
+    def seed(self, user_count, question_count, vote_count):
+        """Bulk insert the users, open questions, choices and votes."""
+        started = time.perf_counter()
+        now = timezone.now()
+        prefix = f'pollbench{time.time_ns()}'
+        User.objects.bulk_create(User(username=f'{prefix}-{i}', password='!') for i in range(user_count))
+        Question.objects.bulk_create(
+            Question(question_text=f'{prefix} question {i}', pub_date=now - datetime.timedelta(minutes=i + 1),
+                     end_date=now + datetime.timedelta(days=1))
+            for i in range(question_count))
+        # SQLite does not return the primary keys of bulk inserts, so read them back.
+        self.user_ids = list(User.objects.filter(username__startswith=prefix).values_list('id', flat=True))
+        self.question_ids = list(Question.objects.filter(question_text__startswith=prefix)
+                                 .values_list('id', flat=True))
+        Choice.objects.bulk_create(
+            Choice(question_id=question_id, choice_text=f'Choice {i}')
+            for question_id in self.question_ids for i in range(CHOICES_PER_QUESTION))
+        self.choices = {}
+        for choice_id, question_id in Choice.objects.filter(question_id__in=self.question_ids).values_list(
+                'id', 'question_id'):
+            self.choices.setdefault(question_id, []).append(choice_id)
+
+        pairs = {(self.random.choice(self.question_ids), self.random.choice(self.user_ids))
+                 for _ in range(vote_count)}
+        votes = [Vote(question_id=question_id, user_id=user_id,
+                      choice_id=self.random.choice(self.choices[question_id]))
+                 for question_id, user_id in pairs]
+        Vote.objects.bulk_create(votes, batch_size=500)
+        tallies = Counter(vote.choice_id for vote in votes)
+        Choice.objects.bulk_update(
+            [Choice(id=choice_id, vote_count=count) for choice_id, count in tallies.items()],
+            ['vote_count'], batch_size=500)
+        return {'users': len(self.user_ids), 'questions': len(self.question_ids), 'votes': len(votes),
+                'seconds': round(time.perf_counter() - started, 3)}
+
+    def drive(self, scenario, total, concurrency=1):
+        """Send total requests of scenario through test clients, each as a random user, from concurrency threads."""
+        started = time.perf_counter()
+        if concurrency <= 1:
+            latencies, queries, errors = self.worker(scenario, total, self.random)
+        else:
+            seeds = [self.random.random() for _ in range(concurrency)]
+            shares = [total // concurrency + (i < total % concurrency) for i in range(concurrency)]
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                results = list(pool.map(self.threaded_worker, [scenario] * concurrency, shares, seeds))
+            latencies = [latency for result in results for latency in result[0]]
+            queries = [count for result in results for count in result[1]]
+            errors = sum(result[2] for result in results)
+        return summarize(latencies, time.perf_counter() - started, errors, queries)
+
+    def threaded_worker(self, scenario, total, seed):
+        """Run a worker in its own thread, with its own database connection."""
+        try:
+            return self.worker(scenario, total, random.Random(seed))
+        finally:
+            connection.close()
+
+    def worker(self, scenario, total, rng):
+        """Send total requests of scenario and return (latencies, queries, errors)."""
+        clients = {}
+        latencies, queries, errors = [], [], 0
+        for _ in range(total):
+            user_id = rng.choice(self.user_ids)
+            client = clients.get(user_id)
+            if client is None:
+                client = clients[user_id] = Client(raise_request_exception=False)
+                client.force_login(User.objects.get(pk=user_id))
+            question_id = rng.choice(self.question_ids)
+            with CaptureQueriesContext(connection) as captured:
+                request_started = time.perf_counter()
+                response = self.request(client, scenario, question_id, rng)
+                latencies.append(time.perf_counter() - request_started)
+            queries.append(len(captured))
+            if response.status_code >= 400:
+                errors += 1
+        return latencies, queries, errors
+
+    def request(self, client, scenario, question_id, rng):
+        """Send one request of scenario."""
+        if scenario == 'index':
+            return client.get(reverse('polls:index'))
+        if scenario == 'detail':
+            return client.get(reverse('polls:detail', args=(question_id,)))
+        if scenario == 'results':
+            return client.get(reverse('polls:results', args=(question_id,)))
+        return client.post(reverse('polls:vote', args=(question_id,)),
+                           {'choice': rng.choice(self.choices[question_id])})
+
+    def compare(self, report, path):
+        """Print the change of every scenario against an earlier report."""
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+        for scenario, summary in report['scenarios'].items():
+            before = baseline.get('scenarios', {}).get(scenario)
+            if before is None:
+                continue
+            self.stdout.write(
+                f"{scenario:8} throughput {change(before['throughput_rps'], summary['throughput_rps'])}  "
+                f"p99 {change(before['latency_ms']['p99'], summary['latency_ms']['p99'])}  "
+                f"queries/req {before['queries_per_request']} -> {summary['queries_per_request']}")
+
+
+def change(before, after):
+    """Format the relative change between two numbers."""
+    if not before:
+        return f"{before} -> {after}"
+    return f"{before} -> {after} ({100 * (after - before) / before:+.1f}%)"
+
+
+def current_commit():
+    """Return the git commit of the working tree, or None outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,313 @@
+"""In-process metrics of the polls app, exposed in the Prometheus text format."""
+import atexit
+import bisect
+import glob
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows, where the workers sharing a directory are not supported.
+    fcntl = None
+
+logger = logging.getLogger("polls")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+
+class Metric:
+    """For hold the values of one metric, one per combination of label values."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def dump(self):
+        """
+        For copy the values out, to be written to the process file.
+
+        :return: list of [label values, value]
+        """
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+
+class Counter(Metric):
+    """For count events, such as votes or logins."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """
+        For add amount to the counter of labels.
+
+        :param amount:
+        :param labels: value of every label name
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    @staticmethod
+    def merge(total, value):
+        return (total or 0) + value
+
+    def samples(self, key, value):
+        yield self.name, key, value
+
+
+class Histogram(Metric):
+    """For count observations, such as request latencies, into buckets."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        """
+        For record one observation.
+
+        :param value:
+        :param labels: value of every label name
+        """
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0, 0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    @staticmethod
+    def merge(total, value):
+        if total is None:
+            return [list(value[0]), value[1], value[2]]
+        return [[a + b for a, b in zip(total[0], value[0])], total[1] + value[1], total[2] + value[2]]
+
+    def samples(self, key, value):
+        counts, total, count = value
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+            cumulative += bucket_count
+            le = '+Inf' if bound == math.inf else repr(float(bound))
+            yield f'{self.name}_bucket', key + (('le', le),), cumulative
+        yield f'{self.name}_sum', key, total
+        yield f'{self.name}_count', key, count
+
+
+class Registry:
+    """
+    For collect the metrics of this process, and of every worker sharing POLLS_METRICS_DIR.
+
+    With POLLS_METRICS_DIR set, each process writes its values to its own
+    JSON file there (at most every POLLS_METRICS_FLUSH_INTERVAL seconds, and
+    at exit), and the endpoint adds up the files of all processes. The files
+    of processes that exited are folded into one, so their counts are kept
+    while the number of files stays that of the live workers.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._flushed_at = 0.0
+        self._flush_lock = threading.Lock()
+
+    def register(self, metric):
+        """
+        For add a metric to the registry.
+
+        :param metric:
+        :return: metric
+        """
+        self._metrics[metric.name] = metric
+        return metric
+
+    def dump(self):
+        """
+        For copy the values of every metric.
+
+        :return: dict of metric name to its dumped values
+        """
+        return {name: metric.dump() for name, metric in self._metrics.items()}
+
+    def flush(self, force=False):
+        """
+        For write the values of this process to its file in POLLS_METRICS_DIR.
+
+        A failed write is logged, not raised, so it never fails the request
+        that happened to trigger it.
+
+        :param force: write even if the last write was less than POLLS_METRICS_FLUSH_INTERVAL ago
+        """
+        directory = settings.POLLS_METRICS_DIR
+        if not directory:
+            return
+        # A thread finding another one writing skips its turn, unless it must write.
+        if not self._flush_lock.acquire(blocking=force):
+            return
+        try:
+            now = time.monotonic()
+            if not force and now - self._flushed_at < settings.POLLS_METRICS_FLUSH_INTERVAL:
+                return
+            self._flushed_at = now
+            write_json(os.path.join(directory, f'polls-{os.getpid()}.json'), self.dump())
+        except OSError:
+            logger.exception("Could not write the metrics to %s", directory)
+        finally:
+            self._flush_lock.release()
+
+    def fold_exited(self, directory):
+        """
+        For add the files of exited worker processes into polls-exited.json and remove them.
+
+        :param directory: POLLS_METRICS_DIR
+        """
+        if fcntl is None:
+            return
+        with open(os.path.join(directory, 'polls.lock'), 'a') as lock_file:
+            # Two scrapes at once must not fold the same file twice.
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            exited = [path for path in glob.glob(os.path.join(directory, 'polls-*.json')) if process_exited(path)]
+            if not exited:
+                return
+            archive = os.path.join(directory, 'polls-exited.json')
+            merged = self.merge(read_json(path) for path in [archive] + exited)
+            write_json(archive, {name: [[list(key), value] for key, value in values.items()]
+                                 for name, values in merged.items()})
+            for path in exited:
+                os.remove(path)
+
+    def collect(self):
+        """
+        For add up the values of every process.
+
+        :return: dict of metric name to a dict of label values to the merged value
+        """
+        directory = settings.POLLS_METRICS_DIR
+        if directory:
+            self.flush(force=True)
+            try:
+                self.fold_exited(directory)
+            except OSError:
+                logger.exception("Could not fold the metrics of exited workers in %s", directory)
+            dumps = [read_json(path) for path in glob.glob(os.path.join(directory, 'polls-*.json'))]
+        else:
+            dumps = [self.dump()]
+        return self.merge(dumps)
+
+    def merge(self, dumps):
+        """
+        For add up dumped values.
+
+        :param dumps: dicts of metric name to dumped values, as written by flush
+        :return: dict of metric name to a dict of label values to the merged value
+        """
+        merged = {name: {} for name in self._metrics}
+        for dump in dumps:
+            for name, values in dump.items():
+                metric = self._metrics.get(name)
+                if metric is None:
+                    continue
+                for key, value in values:
+                    key = tuple(key)
+                    merged[name][key] = metric.merge(merged[name].get(key), value)
+        return merged
+
+    def exposition(self):
+        """
+        For render every metric in the Prometheus text format.
+
+        :return: text of the /metrics page
+        """
+        lines = []
+        for name, values in self.collect().items():
+            metric = self._metrics[name]
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for key, value in sorted(values.items()):
+                labels = tuple(zip(metric.labelnames, key))
+                for sample, sample_labels, sample_value in metric.samples(labels, value):
+                    lines.append(f'{sample}{format_labels(sample_labels)} {format_value(sample_value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def read_json(path):
+    """For read a metrics file, as empty if it is missing or half written."""
+    try:
+        with open(path) as metrics_file:
+            return json.load(metrics_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_json(path, data):
+    """For replace a metrics file at once, through a temporary file of its own."""
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.polls-', suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'w') as temp_file:
+            json.dump(data, temp_file)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def process_exited(path):
+    """For know if the worker that wrote the metrics file polls-<pid>.json is gone."""
+    pid = os.path.basename(path)[len('polls-'):-len('.json')]
+    if not pid.isdigit() or int(pid) == os.getpid():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        return False
+    return False
+
+
+def format_labels(labels):
+    """For render label pairs as {name="value",...}."""
+    if not labels:
+        return ''
+    escaped = (value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def format_value(value):
+    """For render a sample value, integers without a decimal point."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+registry = Registry()
+atexit.register(registry.flush, force=True)
+
+# Not labelled by question: one series per poll would grow without bound.
+votes_total = registry.register(Counter(
+    'polls_votes_total', "Votes recorded, by kind (cast, changed).", ['kind']))
+logins_total = registry.register(Counter(
+    'polls_logins_total', "Login attempts, by result (success, failure).", ['result']))
+request_duration = registry.register(Histogram(
+    'polls_request_duration_seconds', "Time to handle a request, by URL name.", ['view']))
+request_queries = registry.register(Histogram(
+    'polls_request_queries', "Database queries run for a request, by URL name.", ['view'], QUERY_BUCKETS))
+cache_requests = registry.register(Counter(
+    'polls_cache_requests_total', "Cache lookups, by cache (index, snapshot) and result (hit, miss).",
+    ['cache', 'result']))
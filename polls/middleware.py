@@ -0,0 +1,250 @@
+"""Middleware of the polls app."""
+import logging
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+
+from .clientip import get_client_ip
+from .metrics import registry, request_duration, request_queries
+from .routers import routing
+from .throttle import THROTTLED_VIEWS, take_token
+
+logger = logging.getLogger("polls")
+
+
+# QueryStats of the request being handled, for count_query.
+_query_stats = ContextVar('polls_query_stats', default=None)
+
+
+def count_query(execute, sql, params, many, context):
+    """For pass a query to the QueryStats of the request being handled, if there is one."""
+    stats = _query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def watch_queries(connection):
+    """
+    For let the requests count the queries of a database connection.
+
+    Connections belong to the thread that opened them and the async stack
+    runs a request's queries in several threads, so the counter is put on
+    every connection once and finds the request through a context variable,
+    which sync_to_async carries into its threads.
+
+    :param connection: Django database wrapper
+    """
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+@contextmanager
+def counting_queries(request, stats):
+    """
+    For count the queries run for a request, in whatever thread they run.
+
+    :param stats: QueryStats to count in, also set as request.polls_query_stats
+    """
+    request.polls_query_stats = stats
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+class QueryStats:
+    """For count and time the queries run while handling one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_sql = ''
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.total += elapsed
+            if elapsed >= self.slowest:
+                self.slowest = elapsed
+                self.slowest_sql = sql
+
+
+class HybridMiddleware:
+    """
+    For middleware that runs in the sync (WSGI) and the async (ASGI) handler alike.
+
+    Under ASGI Django keeps a request on the event loop only while every
+    middleware can run async. One sync-only middleware puts the rest of the
+    chain, view included, behind Django's single sync thread, so the async
+    views would serve one request at a time. Subclasses implement handle()
+    for the sync handler and __acall__() for the async one.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.handle(request)
+
+
+class QueryInstrumentationMiddleware(HybridMiddleware):
+    """
+    For record the query count, total database time and slowest statement of each request.
+
+    The numbers are logged on the polls logger (as a warning once the database
+    time passes POLLS_SLOW_REQUEST_MS) and, with POLLS_QUERY_HEADERS, sent back
+    as X-DB-Queries, X-DB-Time and X-DB-Slowest response headers. The request
+    time and query count also go to the metrics, by URL name.
+    """
+
+    def handle(self, request):
+        stats = QueryStats()
+        started = time.perf_counter()
+        with counting_queries(request, stats):
+            response = self.get_response(request)
+        self.record(request, response, stats, started)
+        registry.flush()
+        return response
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        started = time.perf_counter()
+        with counting_queries(request, stats):
+            response = await self.get_response(request)
+        self.record(request, response, stats, started)
+        # Writing the metrics file blocks, so keep it off the event loop.
+        await sync_to_async(registry.flush, thread_sensitive=False)()
+        return response
+
+    def record(self, request, response, stats, started):
+        """
+        For put the numbers of a finished request in the metrics, the log and the response headers.
+
+        :param stats: QueryStats of the request
+        :param started: perf_counter() value when the request came in
+        """
+        view = request.resolver_match.view_name if request.resolver_match else 'unmatched'
+        request_duration.observe(time.perf_counter() - started, view=view)
+        request_queries.observe(stats.count, view=view)
+        total_ms = round(1000 * stats.total, 3)
+        if settings.POLLS_QUERY_HEADERS:
+            response['X-DB-Queries'] = str(stats.count)
+            response['X-DB-Time'] = f"{total_ms}ms"
+            response['X-DB-Slowest'] = f"{round(1000 * stats.slowest, 3)}ms"
+        level = logging.WARNING if total_ms >= settings.POLLS_SLOW_REQUEST_MS else logging.DEBUG
+        logger.log(level, f"{request.method} {request.path} ran {stats.count} queries in {total_ms}ms", extra={
+            'path': request.path,
+            'status': response.status_code,
+            'db_queries': stats.count,
+            'db_time_ms': total_ms,
+            'db_slowest_ms': round(1000 * stats.slowest, 3),
+            'db_slowest_sql': stats.slowest_sql,
+        })
+
+
+class ReplicaPinningMiddleware(HybridMiddleware):
+    """
+    For let a client read its own writes while the read replicas catch up.
+
+    A response to a request that wrote to the database sets a cookie holding
+    the time until which the client's reads stay on the primary.
+    """
+
+    cookie_name = 'polls_primary_until'
+
+    def handle(self, request):
+        with routing(self.pinned(request)) as state:
+            response = self.get_response(request)
+        return self.pin(state, response)
+
+    async def __acall__(self, request):
+        # The routing state is a context variable, so the view's threads see it too.
+        with routing(self.pinned(request)) as state:
+            response = await self.get_response(request)
+        return self.pin(state, response)
+
+    def pinned(self, request):
+        """
+        For tell whether the client of a request still reads from the primary.
+
+        :return: True if its cookie has not run out yet
+        """
+        try:
+            return float(request.COOKIES.get(self.cookie_name, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def pin(self, state, response):
+        """
+        For keep the client on the primary for a while after a request that wrote.
+
+        :param state: RoutingState of the request
+        :return: the response
+        """
+        if state.wrote and settings.POLLS_READ_REPLICAS:
+            sticky = settings.POLLS_REPLICA_STICKY_SECONDS
+            response.set_cookie(self.cookie_name, str(time.time() + sticky), max_age=math.ceil(sticky),
+                                httponly=True, samesite='Lax')
+        return response
+
+
+class ThrottleMiddleware(HybridMiddleware):
+    """
+    For turn away clients that send votes, logins or results requests faster than their budget.
+
+    Each request of a throttled view spends a token of the bucket of its user
+    and of its client IP (see POLLS_THROTTLE_RATES). When one is empty the view
+    is not run and the response is 429 with a Retry-After header.
+    """
+
+    def handle(self, request):
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.POLLS_THROTTLE_ENABLED or request.resolver_match is None:
+            return None
+        throttled = THROTTLED_VIEWS.get(request.resolver_match.view_name)
+        if throttled is None:
+            return None
+        scope, methods = throttled
+        if methods is not None and request.method not in methods:
+            return None
+        ip = get_client_ip(request)
+        if scope == 'login':
+            # Per address too, so nobody can lock a user out by failing logins under their name.
+            username = request.POST.get('username')
+            user = f'{ip}:{username}' if username else None
+        else:
+            user = request.user.pk if request.user.is_authenticated else None
+        wait = take_token(scope, {'user': user, 'ip': ip})
+        if not wait:
+            return None
+        logger.warning(f"{scope} throttled for {user or 'anonymous'} from {ip}", extra={
+            'event': 'throttled', 'scope': scope, 'user': user, 'ip': ip, 'path': request.path,
+        })
+        response = HttpResponse("Too many requests, please slow down.", status=429, content_type='text/plain')
+        response['Retry-After'] = str(math.ceil(wait))
+        return response
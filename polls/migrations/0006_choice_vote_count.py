@@ -0,0 +1,29 @@
+# Generated by Django 3.1.1 on 2026-10-18 10:12
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_vote_count(apps, schema_editor):
+    """Count the existing votes into the new tally column."""
+    Choice = apps.get_model('polls', 'Choice')
+    Vote = apps.get_model('polls', 'Vote')
+    counts = Vote.objects.values('choice').annotate(total=Count('id'))
+    for row in counts:
+        Choice.objects.filter(pk=row['choice']).update(vote_count=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0005_remove_choice_votes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='choice',
+            name='vote_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(fill_vote_count, migrations.RunPython.noop),
+    ]
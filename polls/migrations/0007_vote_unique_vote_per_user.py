@@ -0,0 +1,35 @@
+# Generated by Django 3.1.1 on 2026-10-18 11:40
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def remove_duplicate_votes(apps, schema_editor):
+    """Keep only the latest vote of each user on a question and recount the tallies."""
+    Choice = apps.get_model('polls', 'Choice')
+    Vote = apps.get_model('polls', 'Vote')
+    duplicates = (Vote.objects.values('question', 'user')
+                  .annotate(latest=Max('id'), total=Count('id'))
+                  .filter(total__gt=1))
+    if not duplicates.exists():
+        return
+    for row in duplicates:
+        Vote.objects.filter(question=row['question'], user=row['user']).exclude(pk=row['latest']).delete()
+    Choice.objects.update(vote_count=0)
+    for row in Vote.objects.values('choice').annotate(total=Count('id')):
+        Choice.objects.filter(pk=row['choice']).update(vote_count=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0006_choice_vote_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_votes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='vote',
+            constraint=models.UniqueConstraint(fields=('question', 'user'), name='unique_vote_per_user'),
+        ),
+    ]
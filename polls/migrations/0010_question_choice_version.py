@@ -0,0 +1,18 @@
+# Generated by Django 3.1.14 on 2026-10-18 20:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0009_question_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='choice_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
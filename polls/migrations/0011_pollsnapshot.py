@@ -0,0 +1,24 @@
+# Generated by Django 3.1.14 on 2026-10-18 20:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0010_question_choice_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PollSnapshot',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='polls.question')),
+                ('results', models.JSONField()),
+                ('question_modified', models.DateTimeField()),
+                ('finalized_at', models.DateTimeField(auto_now_add=True)),
+                ('votes_purged', models.BooleanField(default=False)),
+            ],
+        ),
+    ]
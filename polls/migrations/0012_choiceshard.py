@@ -0,0 +1,33 @@
+# Generated by Django 3.1.14 on 2026-10-18 20:27
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0011_pollsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='counter_shards',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Rows the vote count of each choice is spread over; raise it for very busy polls.', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(64)]),
+        ),
+        migrations.CreateModel(
+            name='ChoiceShard',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('choice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='polls.choice')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='choiceshard',
+            constraint=models.UniqueConstraint(fields=('choice', 'shard'), name='unique_shard_per_choice'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.14 on 2026-10-18 21:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0012_choiceshard'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='question',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='last modified'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.14 on 2026-10-18 21:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0013_question_modified_index'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='question',
+            name='version',
+        ),
+    ]
@@ -2,21 +2,77 @@
 import datetime
 
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 
+class QuestionQuerySet(models.QuerySet):
+    """For update many questions at once."""
+
+    def touch(self, choices=False):
+        """
+        For mark the questions as changed, so cached copies of their pages expire.
+
+        :param choices: the choices themselves changed, not just their tallies
+        :return: number of questions touched
+        """
+        changes = {'modified': timezone.now()}
+        if choices:
+            changes['choice_version'] = models.F('choice_version') + 1
+        return self.update(**changes)
+
+
+class ChoiceQuerySet(models.QuerySet):
+    """For load choices with their vote counts."""
+
+    def with_votes(self):
+        """
+        For add the counts not yet compacted from the shards, so Choice.votes needs no query per choice.
+
+        :return: queryset annotated with pending_votes
+        """
+        return self.annotate(pending_votes=Coalesce(models.Sum('shards__count'), 0))
+
+
 class Question(models.Model):
     """Class for set and save question."""
 
     question_text = models.CharField(max_length=200)
     pub_date = models.DateTimeField('date published')
     end_date = models.DateTimeField('date close')
+    # Moved when a choice is added, edited or removed; keys the cached vote form.
+    choice_version = models.PositiveIntegerField(default=0, editable=False)
+    # Counter rows per choice; more spreads the vote writes of a busy poll over more rows.
+    counter_shards = models.PositiveSmallIntegerField(
+        default=1, validators=[MinValueValidator(1), MaxValueValidator(64)],
+        help_text="Rows the vote count of each choice is spread over; raise it for very busy polls.")
+    modified = models.DateTimeField('last modified', auto_now=True, db_index=True)
+
+    objects = QuestionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'], name='question_published_idx'),
+            models.Index(fields=['end_date', 'pub_date'], name='question_open_idx'),
+        ]
 
     def __str__(self):
         """:return question text."""
         return self.question_text
 
+    def clean(self):
+        """
+        For refuse to reopen a poll whose votes were purged, as its voters could then vote again.
+
+        :raise ValidationError: if the new end_date reopens a purged poll
+        """
+        if (self.pk is not None and self.end_date is not None and self.end_date >= timezone.now()
+                and PollSnapshot.objects.filter(question=self.pk, votes_purged=True).exists()):
+            raise ValidationError({'end_date': "The votes of this poll were purged, so it cannot be reopened."})
+
     def was_published_recently(self):
         """
         For get to know that the question was just published.
@@ -60,10 +116,28 @@ class Choice(models.Model):
 
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     choice_text = models.CharField(max_length=200)
+    vote_count = models.IntegerField(default=0)
+
+    objects = ChoiceQuerySet.as_manager()
 
     @property
     def votes(self):
-        return self.question.vote_set.filter(choice=self).count()
+        """
+        For show the number of votes of this choice.
+
+        Choices loaded with with_votes() or with their shards prefetched are
+        counted without a query; otherwise the shards are summed here.
+
+        :return: stored tally plus the counts not yet compacted from its shards
+        """
+        pending = getattr(self, 'pending_votes', None)
+        if pending is None:
+            prefetched = getattr(self, '_prefetched_objects_cache', {}).get('shards')
+            if prefetched is not None:
+                pending = sum(shard.count for shard in prefetched)
+            else:
+                pending = self.shards.aggregate(total=models.Sum('count'))['total'] or 0
+        return self.vote_count + pending
 
     def __str__(self):
         """
@@ -74,8 +148,41 @@ class Choice(models.Model):
         return self.choice_text
 
 
+class ChoiceShard(models.Model):
+    """For count votes of a choice on one of several rows, so concurrent voters do not queue on one row."""
+
+    choice = models.ForeignKey(Choice, on_delete=models.CASCADE, related_name='shards')
+    shard = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['choice', 'shard'], name='unique_shard_per_choice'),
+        ]
+
+
 class Vote(models.Model):
     """For save the user vote from question"""
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     choice = models.ForeignKey(Choice, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['question', 'user'], name='unique_vote_per_user'),
+        ]
+
+
+class PollSnapshot(models.Model):
+    """For keep the final results of a closed poll, so they are never tallied again."""
+
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True, related_name='snapshot')
+    results = models.JSONField()
+    # Question.modified when the results were frozen; a later edit makes the snapshot stale.
+    question_modified = models.DateTimeField()
+    finalized_at = models.DateTimeField(auto_now_add=True)
+    votes_purged = models.BooleanField(default=False)
+
+    def __str__(self):
+        """:return question text of the snapshot."""
+        return self.results['question_text']
@@ -0,0 +1,33 @@
+"""Build the results of a question from the stored tallies."""
+from django.db.models import F
+
+from .models import Choice
+
+
+def get_results(question):
+    """
+    Collect every choice of question with its votes and share of the total.
+
+    The tallies are stored on Choice, plus its counter shards for busy polls,
+    so this is a single query however many choices the question has.
+
+    :param question:
+    :return: dict with the question, the total votes and one entry per choice
+    """
+    rows = list(Choice.objects.filter(question=question).with_votes().order_by('id').values_list(
+        'id', 'choice_text', F('vote_count') + F('pending_votes')))
+    total = sum(votes for _, _, votes in rows)
+    return {
+        'question_id': question.id,
+        'question_text': question.question_text,
+        'total': total,
+        'choices': [
+            {
+                'id': choice_id,
+                'choice_text': text,
+                'votes': votes,
+                'percent': round(100.0 * votes / total, 1) if total else 0.0,
+            }
+            for choice_id, text, votes in rows
+        ],
+    }
@@ -0,0 +1,89 @@
+"""Database router sending the heavy poll reads to read replicas."""
+import contextlib
+import contextvars
+import functools
+import random
+
+from django.conf import settings
+
+# Users and sessions are read right before they are written, so they always use the primary.
+PRIMARY_APPS = {'auth', 'sessions', 'contenttypes', 'admin'}
+
+
+class RoutingState:
+    """For remember, per request, where its reads may go and whether it wrote."""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.replica_reads = False
+        self.wrote = False
+
+
+_state = contextvars.ContextVar('polls_routing_state', default=None)
+
+
+@contextlib.contextmanager
+def routing(pinned=False):
+    """
+    For route the queries of one request.
+
+    :param pinned: read everything from the primary, because the client wrote recently
+    :return: the RoutingState of the request
+    """
+    state = RoutingState(pinned)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def read_from_replica(view):
+    """
+    For let the poll reads of a view go to a read replica.
+
+    :param view: view function
+    :return: view function whose reads are routed to the replicas
+    """
+    @functools.wraps(view)
+    def replica_view(request, *args, **kwargs):
+        state = _state.get()
+        if state is None:
+            return view(request, *args, **kwargs)
+        state.replica_reads = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            state.replica_reads = False
+
+    return replica_view
+
+
+class ReplicaRouter:
+    """
+    For send the reads of read_from_replica views to a random replica.
+
+    Everything else, all writes and every read of a request from a client that
+    wrote in the last POLLS_REPLICA_STICKY_SECONDS, uses the default database.
+    """
+
+    def db_for_read(self, model, **hints):
+        """Pick a replica for reads of a replica view, or leave it to the default database."""
+        state = _state.get()
+        replicas = settings.POLLS_READ_REPLICAS
+        if (not replicas or state is None or not state.replica_reads or state.pinned or state.wrote
+                or model._meta.app_label in PRIMARY_APPS):
+            return 'default'
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        """Write to the primary and remember when the request wrote poll data."""
+        state = _state.get()
+        # Session and last_login saves do not change what the replicas serve, so they do not pin the client.
+        if state is not None and model._meta.app_label not in PRIMARY_APPS:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Allow relations between objects of the primary and its replicas, which hold the same rows."""
+        return True
@@ -0,0 +1,199 @@
+"""In-memory schedule of when each poll opens and closes."""
+import datetime
+import heapq
+import threading
+import time
+
+from django.conf import settings
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Question
+
+# Sent with question_id when the schedule sees a poll open or close.
+poll_opened = Signal()
+poll_closed = Signal()
+
+# A poll is open up to and including its end_date, so it closes just after it.
+CLOSE_DELAY = datetime.timedelta(microseconds=1)
+# A reload reads the questions modified since the last one began, minus this,
+# so a save whose transaction committed a little after its modified time is not missed.
+RELOAD_OVERLAP = datetime.timedelta(minutes=1)
+
+
+class PollSchedule:
+    """
+    For answer "can this poll be voted now?" without a query or a date comparison per call.
+
+    The open/close times of every poll are loaded once, on first use, into a
+    heap of upcoming transitions. Each lookup only pops the transitions that
+    became due since the last one, so is_open is O(1) between transitions.
+    Question saves and deletes update the schedule directly.
+
+    Every POLLS_SCHEDULE_RELOAD seconds only the questions modified since the
+    last reload are read again, to pick up edits made by other processes. A
+    question deleted by another process stays known here; the views answer
+    404 for it when they read its row. As those edits arrive late, the answer
+    is a fast first check: the vote view confirms it against the question row.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._windows = {}
+        self._open = set()
+        self._heap = []
+        self._loaded_at = None
+        self._synced_at = None
+        self._loading = False
+        # Saves and deletes seen while a reload reads the table, applied on top of it.
+        self._edits = {}
+
+    def is_open(self, question_id):
+        """
+        For know if question can be voted now.
+
+        :param question_id:
+        :return: True or False, or None if there is no such question
+        """
+        self._reload_if_due()
+        with self._lock:
+            self._advance()
+            if question_id not in self._windows:
+                window = Question.objects.using('default').filter(pk=question_id).values_list(
+                    'pub_date', 'end_date').first()
+                if window is None:
+                    return None
+                self._set_window(question_id, *window)
+            return question_id in self._open
+
+    def open_ids(self):
+        """
+        For list the polls that can be voted now.
+
+        :return: frozenset of question ids
+        """
+        self._reload_if_due()
+        with self._lock:
+            self._advance()
+            return frozenset(self._open)
+
+    def update(self, question):
+        """
+        For take in the new dates of a saved question.
+
+        :param question:
+        """
+        with self._lock:
+            if self._loading:
+                self._edits[question.id] = (question.pub_date, question.end_date)
+            if self._loaded_at is not None:
+                self._set_window(question.id, question.pub_date, question.end_date)
+
+    def remove(self, question_id):
+        """
+        For forget a deleted question.
+
+        :param question_id:
+        """
+        with self._lock:
+            if self._loading:
+                self._edits[question_id] = None
+            self._windows.pop(question_id, None)
+            self._open.discard(question_id)
+
+    def reset(self):
+        """For drop everything so the next lookup loads the schedule again."""
+        with self._lock:
+            self._loaded_at = None
+
+    def _reload_if_due(self):
+        # The table is read without holding the lock, so lookups of other
+        # threads go on with the old schedule meanwhile.
+        with self._lock:
+            due = self._loaded_at is None or time.monotonic() - self._loaded_at > settings.POLLS_SCHEDULE_RELOAD
+            if not due or (self._loading and self._loaded_at is not None):
+                return
+            if not self._loading:
+                self._edits = {}
+            self._loading = True
+            since = self._synced_at if self._loaded_at is not None else None
+        started = timezone.now()
+        try:
+            # Always from the primary, so a lagging replica never ends up in the schedule.
+            questions = Question.objects.using('default')
+            if since is not None:
+                questions = questions.filter(modified__gte=since - RELOAD_OVERLAP)
+            rows = list(questions.values_list('id', 'pub_date', 'end_date'))
+        except Exception:
+            with self._lock:
+                self._loading = False
+            raise
+        with self._lock:
+            self._loading = False
+            if since is None:
+                self._load(rows)
+            elif self._loaded_at is not None:
+                self._merge(rows)
+            else:
+                # Reset while the changes were read; the next lookup reads everything.
+                return
+            self._synced_at = started
+
+    def _advance(self):
+        now = timezone.now()
+        while self._heap and self._heap[0][0] <= now:
+            _, question_id, window = heapq.heappop(self._heap)
+            # Entries of a question whose dates changed since are stale, skip them.
+            if self._windows.get(question_id) == window:
+                self._refresh(question_id, now)
+
+    def _load(self, rows):
+        was_open = self._open if self._loaded_at is not None else None
+        self._windows, self._open, self._heap = {}, set(), []
+        for question_id, pub_date, end_date in rows:
+            if question_id not in self._edits:
+                self._set_window(question_id, pub_date, end_date, notify=False)
+        for question_id, window in self._edits.items():
+            if window is not None:
+                self._set_window(question_id, *window, notify=False)
+        self._edits = {}
+        self._loaded_at = time.monotonic()
+        if was_open is None:
+            return
+        # Polls that opened or closed since the last reload, here or in another process.
+        for question_id in self._open - was_open:
+            poll_opened.send(sender=Question, question_id=question_id)
+        for question_id in was_open - self._open:
+            poll_closed.send(sender=Question, question_id=question_id)
+
+    def _merge(self, rows):
+        # Questions saved here while the rows were read are already up to date.
+        for question_id, pub_date, end_date in rows:
+            if question_id not in self._edits and self._windows.get(question_id) != (pub_date, end_date):
+                self._set_window(question_id, pub_date, end_date)
+        self._edits = {}
+        self._loaded_at = time.monotonic()
+
+    def _set_window(self, question_id, pub_date, end_date, notify=True):
+        now = timezone.now()
+        window = (pub_date, end_date)
+        self._windows[question_id] = window
+        for moment in (pub_date, end_date + CLOSE_DELAY):
+            if moment > now:
+                heapq.heappush(self._heap, (moment, question_id, window))
+        self._refresh(question_id, now, notify)
+
+    def _refresh(self, question_id, now, notify=True):
+        pub_date, end_date = self._windows[question_id]
+        is_open = pub_date <= now <= end_date
+        if is_open == (question_id in self._open):
+            return
+        if is_open:
+            self._open.add(question_id)
+        else:
+            self._open.discard(question_id)
+        if notify:
+            (poll_opened if is_open else poll_closed).send(sender=Question, question_id=question_id)
+
+
+schedule = PollSchedule()
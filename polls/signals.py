@@ -0,0 +1,65 @@
+"""Receivers that keep cached poll data in step with the models."""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .auth import user_cache_key
+from .cache import invalidate_index
+from .db import check_connections, tune_sqlite
+from .etags import move_results_stamps
+from .middleware import watch_queries
+from .models import Question, Choice
+from .schedule import poll_closed, poll_opened, schedule
+
+# Sent after a transaction that cast or changed votes commits, with the ids of the questions voted on.
+votes_changed = Signal()
+
+
+@receiver([post_save, post_delete], sender=Question)
+@receiver([post_save, post_delete], sender=Choice)
+def poll_changed(sender, **kwargs):
+    invalidate_index()
+
+
+@receiver([post_save, post_delete], sender=Choice)
+def choice_changed(sender, instance, **kwargs):
+    Question.objects.filter(pk=instance.question_id).touch(choices=True)
+
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, **kwargs):
+    schedule.update(instance)
+
+
+@receiver(post_delete, sender=Question)
+def question_deleted(sender, instance, **kwargs):
+    schedule.remove(instance.id)
+
+
+@receiver([poll_opened, poll_closed])
+def poll_state_changed(sender, question_id, **kwargs):
+    invalidate_index()
+
+
+@receiver(votes_changed)
+def votes_committed(sender, question_ids, **kwargs):
+    move_results_stamps(question_ids)
+
+
+@receiver(connection_created)
+def database_connected(sender, connection, **kwargs):
+    tune_sqlite(connection)
+    watch_queries(connection)
+
+
+@receiver(request_started)
+def database_health_check(sender, **kwargs):
+    check_connections()
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    cache.delete(user_cache_key(instance.pk))
@@ -0,0 +1,147 @@
+"""Frozen results of closed polls, served from memory."""
+import datetime
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .metrics import cache_requests
+from .models import PollSnapshot, Question, Vote
+from .results import get_results
+
+
+class SnapshotCache:
+    """
+    For keep the results of the most recently read closed polls in memory.
+
+    Entries are keyed on (question id, Question.modified), so editing a
+    question in any process makes the entries of every process miss.
+    """
+
+    def __init__(self, maxsize):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.maxsize = maxsize
+
+    def get(self, key):
+        """
+        For look up results, marking them as recently used.
+
+        :param key:
+        :return: results dict, or None
+        """
+        with self._lock:
+            results = self._entries.get(key)
+            if results is not None:
+                self._entries.move_to_end(key)
+            return results
+
+    def put(self, key, results):
+        """
+        For remember results, forgetting the least recently used past maxsize.
+
+        :param key:
+        :param results:
+        """
+        with self._lock:
+            self._entries[key] = results
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """For forget every entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+snapshot_cache = SnapshotCache(settings.POLLS_SNAPSHOT_CACHE_SIZE)
+
+
+def is_final(question, now=None):
+    """
+    For know if the results of question can no longer change.
+
+    :param question:
+    :param now: current time, default timezone.now()
+    :return: True once the poll closed more than POLLS_FINALIZE_GRACE seconds ago
+    """
+    now = timezone.now() if now is None else now
+    return question.end_date + datetime.timedelta(seconds=settings.POLLS_FINALIZE_GRACE) < now
+
+
+def finalize(question):
+    """
+    For freeze the results of a closed poll.
+
+    :param question:
+    :return: the frozen results dict
+    :raise ValueError: if the poll is still open or within its grace period
+    """
+    if not is_final(question):
+        raise ValueError(f"Question {question.id} is not closed yet.")
+    snapshot = PollSnapshot.objects.filter(question=question).first()
+    if snapshot is not None and snapshot.question_modified == question.modified:
+        return snapshot.results
+    results = get_results(question)
+    PollSnapshot.objects.update_or_create(question=question, defaults={
+        'results': results, 'question_modified': question.modified,
+    })
+    return results
+
+
+def results_for(question):
+    """
+    For get the results of question, from memory once the poll is closed.
+
+    Only reads: the snapshots are written by finalizepolls, so a results
+    request never writes and can be served from a read replica. Until then
+    the final tallies are read once and kept in memory all the same.
+
+    :param question:
+    :return: dict like get_results
+    """
+    if not is_final(question):
+        return get_results(question)
+    key = (question.id, question.modified)
+    results = snapshot_cache.get(key)
+    cache_requests.inc(cache='snapshot', result='miss' if results is None else 'hit')
+    if results is None:
+        results = PollSnapshot.objects.filter(question=question, question_modified=question.modified).values_list(
+            'results', flat=True).first()
+        if results is None:
+            results = get_results(question)
+        snapshot_cache.put(key, results)
+    return results
+
+
+def purge_votes(question):
+    """
+    For delete the Vote rows of a finalized poll, keeping the hot vote table small.
+
+    The tallies stay on Choice and in the snapshot, and rebuildtallies leaves
+    purged polls alone.
+
+    :param question:
+    :return: number of votes deleted
+    """
+    with transaction.atomic():
+        snapshot = PollSnapshot.objects.select_for_update().get(question=question)
+        # Nothing refers to votes, so this is a single DELETE however many rows there are.
+        deleted, _ = Vote.objects.filter(question=question).delete()
+        snapshot.votes_purged = True
+        snapshot.save(update_fields=['votes_purged'])
+    return deleted
+
+
+def closed_questions(now=None):
+    """
+    For list the polls that can be finalized.
+
+    :param now: current time, default timezone.now()
+    :return: queryset of the questions closed past the grace period
+    """
+    now = timezone.now() if now is None else now
+    return Question.objects.filter(end_date__lt=now - datetime.timedelta(seconds=settings.POLLS_FINALIZE_GRACE))
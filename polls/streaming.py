@@ -0,0 +1,209 @@
+"""Stream live poll results to browsers with Server-Sent Events over ASGI."""
+import asyncio
+import json
+import re
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.dispatch import receiver
+
+from .models import Question
+from .results import get_results
+from .signals import votes_changed
+
+STREAM_PATH = re.compile(r'^/polls/(?P<question_id>\d+)/results/stream/$')
+
+
+class ResultsBroadcaster:
+    """
+    For share one results computation between every watcher of a poll.
+
+    Each watched poll has one ticker task. It wakes at most
+    POLLS_STREAM_MAX_RATE times a second, recomputes the results only when
+    votes landed since the last tick (or POLLS_STREAM_REFRESH seconds passed,
+    to catch votes cast in other processes) and puts the same payload on the
+    queue of every subscriber.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._tickers = {}
+        self._starting = {}
+        self._latest = {}
+        self._dirty = set()
+        self._dirty_lock = threading.Lock()
+
+    def mark_dirty(self, question_ids):
+        """
+        For flag polls whose results changed. Safe to call from any thread.
+
+        :param question_ids:
+        """
+        with self._dirty_lock:
+            self._dirty.update(question_ids)
+
+    async def subscribe(self, question_id):
+        """
+        For start watching a poll.
+
+        :param question_id:
+        :return: queue that receives the payloads, starting with the current one
+        :raise Question.DoesNotExist: if the poll does not exist
+        """
+        queue = asyncio.Queue(maxsize=1)
+        self._subscribers.setdefault(question_id, set()).add(queue)
+        try:
+            if question_id not in self._tickers:
+                # Claimed before the first await, so the subscribers that arrive
+                # meanwhile wait for this start instead of each starting a ticker.
+                starting = self._starting.get(question_id)
+                if starting is None:
+                    starting = self._starting[question_id] = asyncio.ensure_future(self._start(question_id))
+                # Shielded, so a subscriber leaving early does not cancel the start of the others.
+                await asyncio.shield(starting)
+        except BaseException:
+            self.unsubscribe(question_id, queue)
+            raise
+        queue.put_nowait(self._latest[question_id])
+        return queue
+
+    def unsubscribe(self, question_id, queue):
+        """
+        For stop watching a poll; its ticker stops with the last subscriber.
+
+        :param question_id:
+        :param queue: queue returned by subscribe
+        """
+        subscribers = self._subscribers.get(question_id, set())
+        subscribers.discard(queue)
+        if not subscribers:
+            self._subscribers.pop(question_id, None)
+            self._latest.pop(question_id, None)
+            ticker = self._tickers.pop(question_id, None)
+            if ticker is not None:
+                ticker.cancel()
+
+    async def _start(self, question_id):
+        try:
+            latest = await self._compute(question_id)
+        finally:
+            del self._starting[question_id]
+        # Every subscriber may have left while the results were computed.
+        if question_id in self._subscribers:
+            self._latest[question_id] = latest
+            self._tickers[question_id] = asyncio.ensure_future(self._tick(question_id))
+
+    async def _tick(self, question_id):
+        last_computed = time.monotonic()
+        while True:
+            await asyncio.sleep(1 / settings.POLLS_STREAM_MAX_RATE)
+            with self._dirty_lock:
+                dirty = question_id in self._dirty
+                self._dirty.discard(question_id)
+            if not dirty and time.monotonic() - last_computed < settings.POLLS_STREAM_REFRESH:
+                continue
+            try:
+                payload = await self._compute(question_id)
+            except Question.DoesNotExist:
+                payload = None
+            last_computed = time.monotonic()
+            if payload == self._latest.get(question_id):
+                continue
+            self._latest[question_id] = payload
+            for queue in self._subscribers.get(question_id, ()):
+                # A slow client only needs the newest payload, not every one it missed.
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(payload)
+
+    @staticmethod
+    @sync_to_async
+    def _compute(question_id):
+        return get_results(Question.objects.get(pk=question_id))
+
+
+broadcaster = ResultsBroadcaster()
+
+
+@receiver(votes_changed)
+def results_changed(sender, question_ids, **kwargs):
+    broadcaster.mark_dirty(question_ids)
+
+
+def event(payload):
+    """
+    For encode one Server-Sent Event.
+
+    :param payload: results dict, or None when the poll was deleted
+    :return: bytes of the event
+    """
+    if payload is None:
+        return b"event: closed\ndata: {}\n\n"
+    return f"event: results\ndata: {json.dumps(payload)}\n\n".encode()
+
+
+async def stream_results(scope, receive, send, question_id):
+    """
+    For send the results of a poll as an event stream until the client leaves.
+
+    :param scope: ASGI http scope
+    :param receive:
+    :param send:
+    :param question_id:
+    """
+    try:
+        queue = await broadcaster.subscribe(question_id)
+    except Question.DoesNotExist:
+        await send({'type': 'http.response.start', 'status': 404,
+                    'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b'Poll not found.'})
+        return
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        disconnect = asyncio.ensure_future(_wait_disconnect(receive))
+        while True:
+            update = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({update, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnect in done:
+                update.cancel()
+                break
+            payload = update.result()
+            await send({'type': 'http.response.body', 'body': event(payload), 'more_body': payload is not None})
+            if payload is None:
+                break
+    finally:
+        broadcaster.unsubscribe(question_id, queue)
+
+
+async def _wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def with_results_stream(application):
+    """
+    For serve /polls/<id>/results/stream/ beside the Django ASGI application.
+
+    The stream holds its connection open for as long as the client watches,
+    so it is answered here instead of by a Django view.
+
+    :param application: Django ASGI application that serves everything else
+    :return: ASGI application
+    """
+    async def app(scope, receive, send):
+        match = STREAM_PATH.match(scope.get('path', '')) if scope['type'] == 'http' else None
+        if match is None:
+            return await application(scope, receive, send)
+        return await stream_results(scope, receive, send, int(match.group('question_id')))
+
+    return app
@@ -0,0 +1,72 @@
+"""Vote on many questions in one request."""
+from django.db import IntegrityError
+from django.db.models import BooleanField, ExpressionWrapper, F, Q
+from django.utils import timezone
+
+from .models import Choice, Question
+from .votes import apply_votes
+
+NOT_FOUND = "No such question."
+CLOSED = "This poll is not open for voting."
+INVALID_CHOICE = "Not a choice of this question."
+INVALID = "Question and choice must be numbers."
+
+
+def parse_answers(answers):
+    """
+    For read the {question id: choice id} pairs of a survey.
+
+    :param answers: mapping of question id to choice id, either as text or numbers
+    :return: (dict of int question id to int choice id, dict of question key to error)
+    """
+    votes, errors = {}, {}
+    for question_key, choice_key in answers.items():
+        try:
+            votes[int(question_key)] = int(choice_key)
+        except (TypeError, ValueError):
+            errors[str(question_key)] = INVALID
+    return votes, errors
+
+
+def validate(votes):
+    """
+    For check every answer of a survey with one query for the questions and one for the choices.
+
+    :param votes: dict of question id to choice id
+    :return: (dict of the valid answers, dict of question id to error)
+    """
+    now = timezone.now()
+    questions = Question.objects.only('id').annotate(is_open=ExpressionWrapper(
+        Q(pub_date__lte=now, end_date__gte=now), output_field=BooleanField()),
+        purged=F('snapshot__votes_purged')).in_bulk(votes)
+    choices = Choice.objects.only('id', 'question_id').in_bulk(votes.values())
+    valid, errors = {}, {}
+    for question_id, choice_id in votes.items():
+        question = questions.get(question_id)
+        choice = choices.get(choice_id)
+        if question is None:
+            errors[question_id] = NOT_FOUND
+        elif not question.is_open or question.purged:
+            errors[question_id] = CLOSED
+        elif choice is None or choice.question_id != question_id:
+            errors[question_id] = INVALID_CHOICE
+        else:
+            valid[question_id] = choice_id
+    return valid, errors
+
+
+def submit(user, votes):
+    """
+    For save the valid answers of a survey in one transaction.
+
+    :param user:
+    :param votes: dict of question id to choice id, already validated
+    :return: dict of question id to the previously voted choice id, or None
+    """
+    batch = {(question_id, user.id): choice_id for question_id, choice_id in votes.items()}
+    try:
+        previous = apply_votes(batch)
+    except IntegrityError:
+        # A request of the same user inserted one of these votes meanwhile; now it is an update.
+        previous = apply_votes(batch)
+    return {question_id: choice_id for (question_id, _), choice_id in previous.items()}
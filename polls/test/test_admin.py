@@ -0,0 +1,54 @@
+"""TEST admin of polls app."""
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from polls.admin import EstimatedCountPaginator, QuestionAdmin
+from polls.models import Question
+from polls.test.utils import QueryBudgetMixin, create_question
+from polls.votes import cast_vote
+
+
+class QuestionAdminTests(QueryBudgetMixin, TestCase):
+    """Test the annotated question changelist."""
+
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(username='admin', password='12345678')
+        self.client.force_login(self.admin_user)
+        self.open_question = create_question(question_text="Open question.", days=-3, closed=5)
+        choice = self.open_question.choice_set.create(choice_text="first")
+        self.open_question.choice_set.create(choice_text="second")
+        cast_vote(self.open_question, choice, self.admin_user)
+        create_question(question_text="Closed question.", days=-3, closed=-1)
+        self.admin = QuestionAdmin(Question, AdminSite())
+        self.request = RequestFactory().get('/')
+
+    def test_annotations(self):
+        """Rows carry their tallies and status flags."""
+        questions = {q.question_text: q for q in self.admin.get_queryset(self.request)}
+        opened = questions["Open question."]
+        self.assertEqual((opened.choice_total, opened.vote_total), (2, 1))
+        self.assertTrue(opened.open_for_vote)
+        self.assertTrue(self.admin.is_published(opened))
+        closed = questions["Closed question."]
+        self.assertEqual((closed.choice_total, closed.vote_total), (0, 0))
+        self.assertFalse(self.admin.can_vote(closed))
+        self.assertFalse(self.admin.was_published_recently(closed))
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """The changelist costs the same number of queries for 2 or 12 questions."""
+        url = reverse('admin:polls_question_changelist')
+        self.client.get(url)
+        with self.assertMaxQueries(100) as few:
+            self.client.get(url)
+        for i in range(10):
+            create_question(question_text=f"Question {i}.", days=-1, closed=1).choice_set.create(choice_text="a")
+        with self.assertMaxQueries(len(few)):
+            response = self.client.get(url + '?o=8')
+        self.assertEqual(response.status_code, 200)
+
+    def test_paginator_count(self):
+        """The paginator counts the filtered rows without the annotations."""
+        queryset = self.admin.get_queryset(self.request).filter(question_text__startswith="Open").order_by('id')
+        self.assertEqual(EstimatedCountPaginator(queryset, 50).count, 1)
@@ -0,0 +1,111 @@
+"""TEST async views in polls app."""
+import asyncio
+import threading
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.http import Http404, HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from django.urls import path
+
+from polls import async_views
+from polls.middleware import QueryStats
+from polls.test.utils import create_question
+
+# Both requests must be in the view at once to get past it.
+meeting = threading.Barrier(2, timeout=5)
+
+
+def meet(request):
+    """Wait for the other request at the meeting point."""
+    meeting.wait()
+    return HttpResponse("met")
+
+
+urlpatterns = [path('meet/', async_views.pooled(meet), name='meet')]
+
+
+@override_settings(POLLS_ASYNC_DB_THREADS=0)
+class AsyncViewTests(TestCase):
+    """Test the async views that run their database work off the event loop."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.question = create_question(question_text='vote me', days=-1, closed=5)
+        self.question.choice_set.create(choice_text="first")
+
+    def test_views_are_coroutines(self):
+        """Every async view is a coroutine function so Django awaits it directly."""
+        for view in (async_views.index, async_views.vote_for_poll, async_views.results,
+                     async_views.results_json, async_views.vote):
+            self.assertTrue(asyncio.iscoroutinefunction(view))
+
+    def test_results_json(self):
+        """The async results view returns the same payload as the sync one."""
+        request = self.factory.get('/')
+        response = async_to_sync(async_views.results_json)(request, pk=self.question.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'"total": 0', response.content)
+
+    def test_detail_requires_login(self):
+        """The async detail view keeps the login check of the sync view."""
+        request = self.factory.get('/')
+        request.user = AnonymousUser()
+        response = async_to_sync(async_views.vote_for_poll)(request, pk=self.question.id)
+        self.assertEqual(response.status_code, 302)
+
+    def test_detail_for_user(self):
+        """A logged in user gets the voting form."""
+        request = self.factory.get('/')
+        SessionMiddleware(lambda r: None).process_request(request)
+        request.user = User.objects.create_user(username='lilslimethug', password='12345678')
+        response = async_to_sync(async_views.vote_for_poll)(request, pk=self.question.id)
+        self.assertContains(response, "first")
+
+    def test_executor_is_bounded(self):
+        """The database pool has the configured number of threads."""
+        with self.settings(POLLS_ASYNC_DB_THREADS=3):
+            async_views._executor = None
+            try:
+                self.assertEqual(async_views.db_executor()._max_workers, 3)
+            finally:
+                async_views.db_executor().shutdown()
+                async_views._executor = None
+
+    def test_pool_queries_counted(self):
+        """Queries of a view run in the pool are counted for its request."""
+        stats = QueryStats()
+        request = self.factory.get('/')
+        request.polls_query_stats = stats
+        with self.settings(POLLS_ASYNC_DB_THREADS=1):
+            async_views._executor = None
+            try:
+                with self.assertRaises(Http404):
+                    async_to_sync(async_views.results_json)(request, pk=self.question.id + 100)
+            finally:
+                async_views.db_executor().shutdown()
+                async_views._executor = None
+        self.assertGreaterEqual(stats.count, 1)
+
+
+@override_settings(ROOT_URLCONF=__name__, POLLS_ASYNC_DB_THREADS=2)
+class ConcurrentRequestTests(TestCase):
+    """Test that the async stack serves requests at the same time."""
+
+    def setUp(self):
+        async_views._executor = None
+        meeting.reset()
+
+    def tearDown(self):
+        async_views.db_executor().shutdown()
+        async_views._executor = None
+
+    def test_pooled_views_overlap(self):
+        """Two requests through the whole middleware stack are in their pooled views at the same time."""
+        async def two_requests():
+            client = AsyncClient()
+            return await asyncio.gather(client.get('/meet/'), client.get('/meet/'))
+
+        responses = async_to_sync(two_requests)()
+        self.assertEqual([response.status_code for response in responses], [200, 200])
@@ -0,0 +1,61 @@
+"""TEST cached question list in polls app."""
+import datetime
+
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from polls.cache import GENERATION_KEY, index_generation, index_timeout, invalidate_index, published_questions
+from polls.models import Question
+from polls.test.utils import create_question
+
+
+class IndexCacheTests(TestCase):
+    """Test the cache of the published questions."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_index_served_from_cache(self):
+        """A second index request does not query the questions again."""
+        create_question(question_text="Past question.", days=-3, closed=5)
+        self.client.get(reverse('polls:index'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('polls:index'))
+        self.assertContains(response, "Past question.")
+
+    def test_save_invalidates_cache(self):
+        """Editing a question drops the cached list."""
+        question = create_question(question_text="Past question.", days=-3, closed=5)
+        published_questions()
+        question.question_text = "Edited question."
+        question.save()
+        self.assertEqual([q.question_text for q in published_questions()[0]], ["Edited question."])
+
+    def test_timeout_bounded_by_next_boundary(self):
+        """The cache expires when the next question opens or closes."""
+        now = timezone.now()
+        Question.objects.create(question_text="Opens soon.", pub_date=now + datetime.timedelta(seconds=90),
+                                end_date=now + datetime.timedelta(days=1))
+        Question.objects.create(question_text="Closes soon.", pub_date=now - datetime.timedelta(days=1),
+                                end_date=now + datetime.timedelta(seconds=30))
+        self.assertEqual(index_timeout(now), 30)
+
+    def test_timeout_without_boundary(self):
+        """With nothing left to open or close the default timeout applies."""
+        create_question(question_text="Closed question.", days=-3, closed=-1)
+        with self.settings(POLLS_INDEX_CACHE_TIMEOUT=600):
+            self.assertEqual(index_timeout(timezone.now()), 600)
+
+    @skipUnless(settings.CACHES['default']['BACKEND'].endswith('FileBasedCache'), "needs the default file cache")
+    def test_invalidation_reaches_other_processes(self):
+        """Another process, with its own handle on the cache, sees the index invalidated here."""
+        other_process = FileBasedCache(cache._dir, {})
+        index_generation()
+        invalidate_index()
+        self.assertEqual(other_process.get(GENERATION_KEY), index_generation())
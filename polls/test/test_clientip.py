@@ -0,0 +1,23 @@
+"""TEST client address lookup in polls app."""
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from polls.clientip import get_client_ip
+
+
+class ClientIpTests(SimpleTestCase):
+    """Test which X-Forwarded-For addresses are believed."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_header_ignored_from_clients(self):
+        """A client sending the header itself keeps its own address."""
+        request = self.factory.get('/', REMOTE_ADDR='203.0.113.7', HTTP_X_FORWARDED_FOR='10.0.0.2')
+        self.assertEqual(get_client_ip(request), '203.0.113.7')
+
+    @override_settings(POLLS_TRUSTED_PROXIES=['127.0.0.1', '10.0.0.1'])
+    def test_rightmost_untrusted_address(self):
+        """Behind trusted proxies the last address they did not add is the client."""
+        request = self.factory.get('/', REMOTE_ADDR='127.0.0.1',
+                                   HTTP_X_FORWARDED_FOR='6.6.6.6, 203.0.113.7, 10.0.0.1')
+        self.assertEqual(get_client_ip(request), '203.0.113.7')
@@ -0,0 +1,36 @@
+"""TEST database connection tuning in polls app."""
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from polls.db import check_connections, tune_sqlite
+
+
+class DatabaseTuningTests(TestCase):
+    """Test the SQLite pragmas and connection health check."""
+
+    @override_settings(POLLS_SQLITE_PRAGMAS={'busy_timeout': 1234, 'temp_store': 'MEMORY'})
+    def test_sqlite_pragmas(self):
+        """Every pragma of POLLS_SQLITE_PRAGMAS is set on the connection."""
+        if connection.vendor != 'sqlite':
+            self.skipTest("SQLite only")
+        tune_sqlite(connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 1234)
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+    @override_settings(POLLS_DB_HEALTH_CHECK_INTERVAL=60)
+    def test_broken_connection_is_closed(self):
+        """A persistent connection that is no longer usable is closed, once per interval."""
+        connection.ensure_connection()
+        with mock.patch.dict(connection.settings_dict, CONN_MAX_AGE=60), \
+                mock.patch.object(connection, 'polls_checked_at', 0, create=True), \
+                mock.patch.object(connection, 'is_usable', return_value=False) as is_usable, \
+                mock.patch.object(connection, 'close') as close:
+            check_connections()
+            check_connections()
+        is_usable.assert_called_once()
+        close.assert_called_once()
@@ -0,0 +1,100 @@
+"""TEST conditional GET of the poll pages in polls app."""
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from polls.models import Choice, Question
+from polls.votes import cast_vote
+from polls.test.utils import create_question
+
+
+class ResultsConditionalTests(TestCase):
+    """Test the ETag of the results."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='lilslimethug', password='12345678')
+        self.question = create_question(question_text='vote me', days=-1, closed=5)
+        self.choice = self.question.choice_set.create(choice_text="first")
+        self.url = reverse('polls:results', args=(self.question.id,))
+
+    def test_not_modified(self):
+        """A matching If-None-Match is answered with 304 after reading only the question."""
+        response = self.client.get(self.url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_vote_changes_etag(self):
+        """A committed vote moves the results stamp, so the page is sent again."""
+        etag = self.client.get(self.url)['ETag']
+        # TestCase never commits, so run the on_commit hooks straight away.
+        with mock.patch('polls.votes.transaction.on_commit', side_effect=lambda func: func()):
+            cast_vote(self.question, self.choice, self.user)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.context['results']['total'], 1)
+
+    def test_json_not_modified(self):
+        """The JSON results share the validators of the page."""
+        url = reverse('polls:results_json', args=(self.question.id,))
+        response = self.client.get(url)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_vote_leaves_question_row_alone(self):
+        """Voting writes no question row; the stamp moves in the cache once the vote commits."""
+        etag = self.client.get(self.url)['ETag']
+        modified = Question.objects.get(pk=self.question.pk).modified
+        with mock.patch('polls.votes.transaction.on_commit') as on_commit:
+            cast_vote(self.question, self.choice, self.user)
+        self.assertEqual(Question.objects.get(pk=self.question.pk).modified, modified)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        on_commit.call_args[0][0]()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_last_modified(self):
+        """The results carry the time of the last vote, and If-Modified-Since is answered with 304."""
+        response = self.client.get(self.url)
+        self.assertIn('Last-Modified', response)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_rebuild_changes_etag(self):
+        """Recounting drifted tallies expires the ETag and the cached table."""
+        # A tally drifted by a change made behind the app's back, which only rebuildtallies sees.
+        Choice.objects.filter(pk=self.choice.pk).update(vote_count=5)
+        etag = self.client.get(self.url)['ETag']
+        call_command('rebuildtallies', stdout=StringIO())
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['results']['total'], 0)
+        self.assertContains(response, '<th>0</th>')
+
+
+class IndexConditionalTests(TestCase):
+    """Test the ETag of the index."""
+
+    def setUp(self):
+        cache.clear()
+        create_question(question_text='vote me', days=-1, closed=5)
+        self.url = reverse('polls:index')
+
+    def test_new_question_changes_etag(self):
+        """The index is not modified until a question is added."""
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        create_question(question_text='new one', days=-1, closed=5)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_per_user(self):
+        """Logging in changes the index, which greets the user."""
+        etag = self.client.get(self.url)['ETag']
+        self.client.force_login(User.objects.create_user(username='lilslimethug', password='12345678'))
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
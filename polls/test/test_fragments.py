@@ -0,0 +1,43 @@
+"""TEST cached template fragments of the poll pages in polls app."""
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+
+from polls.votes import cast_vote
+from polls.test.utils import create_question
+
+
+class FragmentCacheTests(TestCase):
+    """Test the cached choice form and results table."""
+
+    def setUp(self):
+        caches['template_fragments'].clear()
+        self.user = User.objects.create_user(username='lilslimethug', password='12345678')
+        self.question = create_question(question_text='vote me', days=-1, closed=5)
+        self.first = self.question.choice_set.create(choice_text="first")
+        self.second = self.question.choice_set.create(choice_text="second")
+
+    def test_results_table_cached_until_vote(self):
+        """The table is rendered once per state of the tallies."""
+        url = reverse('polls:results', args=(self.question.id,))
+        self.client.get(url)
+        self.assertContains(self.client.get(url), "<th>0</th>")
+        # TestCase never commits, so run the on_commit hooks straight away.
+        with mock.patch('polls.votes.transaction.on_commit', side_effect=lambda func: func()):
+            cast_vote(self.question, self.first, self.user)
+        self.assertContains(self.client.get(url), "<th>1</th>")
+
+    def test_choice_form_cached_until_choices_change(self):
+        """A new choice shows up, and the previous vote is still rendered per user."""
+        self.client.force_login(self.user)
+        url = reverse('polls:detail', args=(self.question.id,))
+        self.client.get(url)
+        self.client.post(reverse('polls:vote', args=(self.question.id,)), {'choice': self.second.id})
+        response = self.client.get(url)
+        self.assertEqual(response.context['previous_vote'], "second")
+        self.assertNotContains(response, "third")
+        self.question.choice_set.create(choice_text="third")
+        self.assertContains(self.client.get(url), "third")
@@ -0,0 +1,81 @@
+"""TEST bulk import and streaming export in polls app."""
+import csv
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+
+from polls.models import Question, Choice
+from polls.votes import cast_vote
+
+
+class ImportExportTests(TestCase):
+    """Test the importpolls and exportpolls commands and the export view."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as source:
+            source.write(text)
+        return path
+
+    def test_import_csv(self):
+        """CSV rows become questions with their '|' separated choices."""
+        path = self.write('polls.csv', "question_text,pub_date,end_date,choices\n"
+                                       "Lunch?,2026-01-01 10:00,2026-01-02 10:00,Rice|Noodles\n"
+                                       "Dinner?,2026-01-01T10:00:00+07:00,2026-01-03T10:00:00+07:00,Soup\n")
+        call_command('importpolls', path, batch_size=1, stdout=io.StringIO())
+        self.assertEqual(Question.objects.count(), 2)
+        self.assertEqual(list(Choice.objects.filter(question__question_text="Lunch?")
+                              .values_list('choice_text', flat=True)), ["Rice", "Noodles"])
+
+    def test_import_jsonl(self):
+        """JSON lines become questions with their choice lists."""
+        line = {"question_text": "Lunch?", "pub_date": "2026-01-01T10:00:00Z",
+                "end_date": "2026-01-02T10:00:00Z", "choices": ["Rice", "Noodles", "Bread"]}
+        path = self.write('polls.jsonl', json.dumps(line) + "\n")
+        call_command('importpolls', path, stdout=io.StringIO())
+        self.assertEqual(Choice.objects.count(), 3)
+
+    def test_import_rejects_bad_date(self):
+        """A malformed date stops the import with the line number."""
+        path = self.write('polls.csv', "question_text,pub_date,end_date,choices\nLunch?,soon,later,Rice\n")
+        with self.assertRaisesMessage(CommandError, "Line 2: pub_date"):
+            call_command('importpolls', path, stdout=io.StringIO())
+
+    def test_export_tallies_and_votes(self):
+        """The export carries one row per choice with its tally, or one row per vote."""
+        path = self.write('polls.jsonl', json.dumps({"question_text": "Lunch?", "pub_date": "2026-01-01T10:00:00Z",
+                                                     "end_date": "2999-01-02T10:00:00Z",
+                                                     "choices": ["Rice", "Noodles"]}))
+        call_command('importpolls', path, stdout=io.StringIO())
+        question = Question.objects.get()
+        rice = question.choice_set.get(choice_text="Rice")
+        cast_vote(question, rice, User.objects.create_user(username='lilslimethug'))
+        out = io.StringIO()
+        call_command('exportpolls', stdout=out)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual([(row['choice_text'], row['votes']) for row in rows], [("Rice", "1"), ("Noodles", "0")])
+        out = io.StringIO()
+        call_command('exportpolls', format='jsonl', votes=True, stdout=out)
+        self.assertEqual(json.loads(out.getvalue())['choice_id'], rice.id)
+
+    def test_export_view_is_streamed_for_staff(self):
+        """Staff get a streaming download, other users are sent to the login page."""
+        User.objects.create_user(username='staff', password='12345678', is_staff=True)
+        User.objects.create_user(username='student', password='12345678')
+        self.client.login(username='student', password='12345678')
+        self.assertEqual(self.client.get(reverse('polls:export')).status_code, 302)
+        self.client.login(username='staff', password='12345678')
+        response = self.client.get(reverse('polls:export'), {'format': 'jsonl'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
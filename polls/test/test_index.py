@@ -1,6 +1,7 @@
 """TEST index in polls app."""
 import datetime
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from django.urls import reverse
 
@@ -22,6 +23,9 @@ def create_question(question_text, days, closed):
 class QuestionIndexViewTests(TestCase):
     """Test the index page."""
 
+    def setUp(self):
+        cache.clear()
+
     def test_no_questions(self):
         """If no questions exist, an appropriate message is displayed."""
         response = self.client.get(reverse('polls:index'))
@@ -64,3 +68,37 @@ class QuestionIndexViewTests(TestCase):
             response.context['latest_question_list'],
             ['<Question: Past question 2.>', '<Question: Past question 1.>']
         )
+
+
+@override_settings(POLLS_INDEX_PAGE_SIZE=2)
+class QuestionIndexPaginationTests(TestCase):
+    """Test the cursor pages and the open filter of the index page."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pages_follow_cursor(self):
+        """The next cursor leads to the older questions without repeating any."""
+        for days in range(1, 6):
+            create_question(question_text=f"Question {days}.", days=-days, closed=10)
+        response = self.client.get(reverse('polls:index'))
+        first_page = [q.question_text for q in response.context['latest_question_list']]
+        self.assertEqual(first_page, ["Question 1.", "Question 2."])
+        response = self.client.get(reverse('polls:index'), {'after': response.context['next_cursor']})
+        second_page = [q.question_text for q in response.context['latest_question_list']]
+        self.assertEqual(second_page, ["Question 3.", "Question 4."])
+        response = self.client.get(reverse('polls:index'), {'after': response.context['next_cursor']})
+        self.assertEqual([q.question_text for q in response.context['latest_question_list']], ["Question 5."])
+        self.assertIsNone(response.context['next_cursor'])
+
+    def test_open_only(self):
+        """The open filter leaves out the closed questions."""
+        create_question(question_text="Closed question.", days=-5, closed=-1)
+        create_question(question_text="Open question.", days=-5, closed=5)
+        response = self.client.get(reverse('polls:index'), {'open': '1'})
+        self.assertQuerysetEqual(response.context['latest_question_list'], ['<Question: Open question.>'])
+
+    def test_invalid_cursor(self):
+        """A malformed cursor returns 404."""
+        response = self.client.get(reverse('polls:index'), {'after': 'nope'})
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,53 @@
+"""TEST queued vote ingestion in polls app."""
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from polls.ingest import VoteQueue, vote_queue
+from polls.models import Choice, Vote
+from polls.test.utils import create_question
+
+
+@override_settings(POLLS_VOTE_INGESTION='queued', POLLS_VOTE_BATCH_SIZE=1000, POLLS_VOTE_BATCH_DELAY=3600)
+@mock.patch.object(VoteQueue, '_ensure_thread')
+class QueuedVoteTests(TestCase):
+    """Test votes that go through the write-behind queue."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='lilslimethug', password='12345678')
+        self.client.login(username='lilslimethug', password='12345678')
+        self.question = create_question(question_text='vote me', days=-1, closed=5)
+        self.first = self.question.choice_set.create(choice_text="first")
+        self.second = self.question.choice_set.create(choice_text="second")
+
+    def tearDown(self):
+        vote_queue.flush()
+
+    def vote(self, choice):
+        return self.client.post(reverse('polls:vote', args=(self.question.id,)), {'choice': choice.id})
+
+    def test_vote_is_queued_until_flush(self, ensure_thread):
+        """The vote request does not write, the flush does."""
+        self.vote(self.first)
+        self.assertFalse(Vote.objects.exists())
+        self.assertEqual(vote_queue.flush(), 1)
+        self.assertEqual(Vote.objects.get().choice, self.first)
+        self.assertEqual(Choice.objects.get(pk=self.first.id).votes, 1)
+
+    def test_queue_keeps_last_vote_of_user(self, ensure_thread):
+        """Several votes of one user are coalesced into the last one."""
+        self.vote(self.first)
+        self.vote(self.second)
+        self.assertEqual(len(vote_queue), 1)
+        vote_queue.flush()
+        self.assertEqual(Vote.objects.get().choice, self.second)
+        self.assertEqual(Choice.objects.get(pk=self.first.id).votes, 0)
+        self.assertEqual(Choice.objects.get(pk=self.second.id).votes, 1)
+
+    def test_detail_shows_queued_vote(self, ensure_thread):
+        """The voter sees their own vote before it is flushed."""
+        self.vote(self.second)
+        response = self.client.get(reverse('polls:detail', args=(self.question.id,)))
+        self.assertEqual(response.context['previous_vote'], "second")
@@ -0,0 +1,77 @@
+"""TEST structured logging in polls app."""
+import datetime
+import io
+import json
+import logging
+from contextlib import redirect_stdout
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from polls.log import JsonFormatter, NonBlockingHandler
+from polls.models import Question
+
+
+class JsonFormatterTests(SimpleTestCase):
+    """Test the JSON log lines."""
+
+    def test_extra_fields(self):
+        """Fields passed as `extra` become keys of the JSON object."""
+        record = logging.makeLogRecord({'name': 'polls', 'levelname': 'INFO', 'msg': 'user %s voted',
+                                        'args': ('bob',), 'event': 'vote', 'question': 3})
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual(entry['message'], 'user bob voted')
+        self.assertEqual(entry['event'], 'vote')
+        self.assertEqual(entry['question'], 3)
+        self.assertNotIn('args', entry)
+
+
+class NonBlockingHandlerTests(SimpleTestCase):
+    """Test the queue handler that writes from a background thread."""
+
+    def test_writes_from_background_thread(self):
+        """Records reach the stream once the listener drains the queue."""
+        stream = io.StringIO()
+        handler = NonBlockingHandler(stream=stream)
+        handler.setFormatter(JsonFormatter())
+        handler.handle(logging.makeLogRecord({'msg': 'hello', 'levelno': logging.INFO, 'event': 'test'}))
+        handler.close()
+        self.assertEqual(json.loads(stream.getvalue())['event'], 'test')
+
+    def test_drops_when_full(self):
+        """A full queue drops and counts records instead of blocking."""
+        handler = NonBlockingHandler(maxsize=1, stream=io.StringIO())
+        handler.stop()
+        for _ in range(3):
+            handler.handle(logging.makeLogRecord({'msg': 'hello'}))
+        self.assertEqual(handler.dropped, 2)
+
+
+class VoteLoggingTests(TestCase):
+    """Test the events logged by the views."""
+
+    def test_vote_event_without_print(self):
+        """A vote logs a structured event and prints nothing."""
+        User.objects.create_user(username='lilslimethug', password='12345678')
+        self.client.login(username='lilslimethug', password='12345678')
+        now = timezone.now()
+        question = Question.objects.create(question_text='vote me', pub_date=now - datetime.timedelta(days=1),
+                                           end_date=now + datetime.timedelta(days=1))
+        choice = question.choice_set.create(choice_text="check")
+        stdout = io.StringIO()
+        with redirect_stdout(stdout), self.assertLogs('polls', level='INFO') as logs:
+            self.client.post(reverse('polls:vote', args=(question.id,)), {'choice': choice.id})
+        self.assertEqual(stdout.getvalue(), '')
+        vote_record = next(record for record in logs.records if getattr(record, 'event', None) == 'vote')
+        self.assertEqual(vote_record.user, 'lilslimethug')
+        self.assertEqual(vote_record.choice, choice.id)
+
+    def test_failed_login_without_request(self):
+        """authenticate() without a request logs the failure with no address."""
+        with self.assertLogs('polls', level='WARNING') as logs:
+            self.assertIsNone(authenticate(username='nobody', password='wrong'))
+        record = next(record for record in logs.records if getattr(record, 'event', None) == 'login_failed')
+        self.assertIsNone(record.ip)
@@ -0,0 +1,110 @@
+"""TEST metrics registry and endpoint in polls app."""
+import json
+import os
+import tempfile
+from unittest import mock, skipIf
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from polls import metrics
+from polls.metrics import Counter, Histogram, Registry, registry
+from polls.test.utils import create_question
+
+
+EXITED_PID = 999999
+
+
+def sample(text, line_start):
+    """Return the value of the sample line starting with line_start, or None."""
+    for line in text.splitlines():
+        if line.startswith(line_start + ' '):
+            return float(line.split()[-1])
+    return None
+
+
+@override_settings(POLLS_METRICS_DIR=None)
+class RegistryTests(TestCase):
+    """Test the metric types and their text format."""
+
+    def setUp(self):
+        self.registry = Registry()
+        self.counter = self.registry.register(Counter('test_total', "Things.", ['kind']))
+        self.histogram = self.registry.register(Histogram('test_seconds', "Time.", ['view'], buckets=(0.1, 1)))
+
+    def test_exposition(self):
+        """Counters and cumulative histogram buckets are rendered per label."""
+        self.counter.inc(kind='a')
+        self.counter.inc(2, kind='a')
+        self.histogram.observe(0.05, view='x')
+        self.histogram.observe(0.5, view='x')
+        text = self.registry.exposition()
+        self.assertIn('# TYPE test_total counter', text)
+        self.assertEqual(sample(text, 'test_total{kind="a"}'), 3)
+        self.assertEqual(sample(text, 'test_seconds_bucket{view="x",le="0.1"}'), 1)
+        self.assertEqual(sample(text, 'test_seconds_bucket{view="x",le="+Inf"}'), 2)
+        self.assertEqual(sample(text, 'test_seconds_count{view="x"}'), 2)
+
+    def test_process_files_added_up(self):
+        """With a metrics directory, the files of every worker are summed."""
+        self.counter.inc(kind='a')
+        with tempfile.TemporaryDirectory() as directory, override_settings(POLLS_METRICS_DIR=directory):
+            with open(os.path.join(directory, 'polls-1.json'), 'w') as other:
+                json.dump({'test_total': [[['a'], 4]], 'test_seconds': [[['x'], [[1, 0, 0], 0.05, 1]]]}, other)
+            text = self.registry.exposition()
+        self.assertEqual(sample(text, 'test_total{kind="a"}'), 5)
+        self.assertEqual(sample(text, 'test_seconds_count{view="x"}'), 1)
+
+    @skipIf(metrics.fcntl is None, "Folding needs file locks.")
+    def test_exited_workers_folded(self):
+        """The file of an exited worker is folded into the archive, keeping its counts."""
+        with tempfile.TemporaryDirectory() as directory, override_settings(POLLS_METRICS_DIR=directory):
+            with open(os.path.join(directory, f'polls-{EXITED_PID}.json'), 'w') as other:
+                json.dump({'test_total': [[['a'], 4]]}, other)
+            with mock.patch('polls.metrics.process_exited', side_effect=lambda path: str(EXITED_PID) in path):
+                self.assertEqual(sample(self.registry.exposition(), 'test_total{kind="a"}'), 4)
+                self.assertEqual(sample(self.registry.exposition(), 'test_total{kind="a"}'), 4)
+            self.assertFalse(os.path.exists(os.path.join(directory, f'polls-{EXITED_PID}.json')))
+            self.assertTrue(os.path.exists(os.path.join(directory, 'polls-exited.json')))
+
+    def test_failed_flush_logged(self):
+        """A metrics directory that cannot be written does not fail the request."""
+        self.counter.inc(kind='a')
+        with override_settings(POLLS_METRICS_DIR='/nonexistent/metrics'), self.assertLogs('polls', 'ERROR'):
+            self.registry.flush(force=True)
+
+
+@override_settings(POLLS_METRICS_DIR=None)
+class MetricsEndpointTests(TestCase):
+    """Test the /metrics page."""
+
+    def setUp(self):
+        User.objects.create_user(username='lilslimethug', password='12345678')
+        self.client.login(username='lilslimethug', password='12345678')
+        self.question = create_question(question_text='vote me', days=-1, closed=5)
+        self.choice = self.question.choice_set.create(choice_text="first")
+
+    @override_settings(POLLS_METRICS_TOKEN='s3cret')
+    def test_vote_and_latency_metrics(self):
+        """A vote shows up in the vote counter and the vote view latency."""
+        vote_sample = 'polls_votes_total{kind="cast"}'
+        before = sample(registry.exposition(), vote_sample) or 0
+        self.client.post(reverse('polls:vote', args=(self.question.id,)), {'choice': self.choice.id})
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertEqual(sample(text, vote_sample), before + 1)
+        self.assertGreaterEqual(sample(text, 'polls_request_duration_seconds_count{view="polls:vote"}'), 1)
+
+    @override_settings(POLLS_METRICS_TOKEN='s3cret')
+    def test_forbidden_without_token(self):
+        """Without the token, even localhost (a proxy on the same host) cannot read the metrics."""
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(POLLS_METRICS_ALLOWED_IPS=['10.0.0.9'])
+    def test_allowed_address(self):
+        """A configured scraper address can read the metrics."""
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.9').status_code, 200)
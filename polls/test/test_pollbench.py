@@ -0,0 +1,30 @@
+"""TEST benchmark command in polls app."""
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from polls.models import Question, Choice, Vote
+
+
+class PollBenchTests(TestCase):
+    """Test the pollbench management command."""
+
+    def test_report(self):
+        """A small run seeds the data and reports every scenario as JSON."""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            call_command('pollbench', in_place=True, users=3, questions=2, votes=4, requests=3,
+                         output=output, stdout=StringIO())
+            with open(output) as report_file:
+                report = json.load(report_file)
+        self.assertEqual(set(report['scenarios']), {'index', 'detail', 'vote', 'results'})
+        for summary in report['scenarios'].values():
+            self.assertEqual(summary['requests'], 3)
+            self.assertEqual(summary['errors'], 0)
+            self.assertGreater(summary['queries_per_request'], 0)
+        self.assertEqual(Question.objects.count(), 2)
+        self.assertEqual(sum(Choice.objects.values_list('vote_count', flat=True)), Vote.objects.count())
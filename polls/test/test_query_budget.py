@@ -0,0 +1,92 @@
+"""TEST query budgets of the polls hot paths."""
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from polls.models import Question
+from polls.test.utils import QueryBudgetMixin, create_question, query_budget
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Test that the hot paths stay within their query budget."""
+
+    def setUp(self):
+        cache.clear()
+        self.question = create_question(question_text='vote me', days=-1, closed=5)
+        self.choices = [self.question.choice_set.create(choice_text=f"choice {i}") for i in range(20)]
+        self.user = User.objects.create_user(username='lilslimethug', password='12345678')
+
+    def test_results_budget(self):
+        """The results page runs at most 2 queries however many choices there are."""
+        with self.assertMaxQueries(2):
+            self.client.get(reverse('polls:results', args=(self.question.id,)))
+
+    def test_results_json_budget(self):
+        """The JSON results run at most 2 queries."""
+        with self.assertMaxQueries(2):
+            self.client.get(reverse('polls:results_json', args=(self.question.id,)))
+
+    def test_detail_budget(self):
+        """The detail page of a logged in user runs at most 6 queries."""
+        self.client.force_login(self.user)
+        with self.assertMaxQueries(6):
+            self.client.get(reverse('polls:detail', args=(self.question.id,)))
+
+    def test_vote_budget(self):
+        """Casting a vote runs at most 12 queries, savepoints and the session save included."""
+        self.client.force_login(self.user)
+        with self.assertMaxQueries(12):
+            self.client.post(reverse('polls:vote', args=(self.question.id,)), {'choice': self.choices[0].id})
+
+    def test_changed_vote_budget(self):
+        """Changing a vote runs at most 13 queries, the tallies of both choices moving in one statement."""
+        self.client.force_login(self.user)
+        self.client.post(reverse('polls:vote', args=(self.question.id,)), {'choice': self.choices[0].id})
+        with self.assertMaxQueries(13):
+            self.client.post(reverse('polls:vote', args=(self.question.id,)), {'choice': self.choices[1].id})
+
+    def test_repeated_vote_budget(self):
+        """Voting the same choice again runs at most 8 queries and writes no tally."""
+        self.client.force_login(self.user)
+        self.client.post(reverse('polls:vote', args=(self.question.id,)), {'choice': self.choices[0].id})
+        with self.assertMaxQueries(8):
+            self.client.post(reverse('polls:vote', args=(self.question.id,)), {'choice': self.choices[0].id})
+
+    @query_budget(3)
+    def test_cached_index_budget(self):
+        """A cached index page only costs the first request's queries."""
+        for _ in range(5):
+            self.client.get(reverse('polls:index'))
+
+    def test_budget_failure_lists_queries(self):
+        """Going over budget fails the test and shows the statements."""
+        with self.assertRaisesMessage(AssertionError, "2 queries executed, budget is 1"):
+            with self.assertMaxQueries(1):
+                Question.objects.count()
+                Question.objects.count()
+
+
+@override_settings(POLLS_QUERY_HEADERS=True)
+class QueryInstrumentationTests(TestCase):
+    """Test the per-request SQL instrumentation middleware."""
+
+    def setUp(self):
+        caches['template_fragments'].clear()
+
+    def test_headers(self):
+        """Responses carry the query count and database time."""
+        question = create_question(question_text='vote me', days=-1, closed=5)
+        response = self.client.get(reverse('polls:results', args=(question.id,)))
+        self.assertEqual(response['X-DB-Queries'], '2')
+        self.assertTrue(response['X-DB-Time'].endswith('ms'))
+        self.assertIn('X-DB-Slowest', response)
+
+    def test_log_fields(self):
+        """The query stats are logged as fields of the record."""
+        with self.assertLogs('polls', level='DEBUG') as logs:
+            self.client.get(reverse('polls:index'))
+        record = logs.records[-1]
+        self.assertEqual(record.path, reverse('polls:index'))
+        self.assertEqual(record.status, 200)
+        self.assertGreaterEqual(record.db_queries, 1)
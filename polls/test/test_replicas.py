@@ -0,0 +1,89 @@
+"""TEST read replica routing in polls app."""
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from polls.middleware import ReplicaPinningMiddleware
+from polls.models import Question
+from polls.routers import ReplicaRouter, read_from_replica, routing
+from polls.test.utils import create_question
+
+
+@override_settings(POLLS_READ_REPLICAS=['replica1'])
+class ReplicaRouterTests(TestCase):
+    """Test where the router sends reads."""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def read_alias(self, model=Question, **state):
+        """Return the database a read of model goes to inside a replica view."""
+        with routing(state.pop('pinned', False)) as routing_state:
+            for name, value in state.items():
+                setattr(routing_state, name, value)
+            return read_from_replica(lambda request: self.router.db_for_read(model))(None)
+
+    def test_replica_view_reads_replica(self):
+        """Poll reads of a replica view go to a replica, other reads to the primary."""
+        self.assertEqual(self.read_alias(), 'replica1')
+        self.assertEqual(self.read_alias(User), 'default')
+        with routing():
+            self.assertEqual(self.router.db_for_read(Question), 'default')
+        self.assertEqual(self.router.db_for_read(Question), 'default')
+
+    def test_primary_after_write(self):
+        """A pinned client, or a request that already wrote, reads the primary."""
+        self.assertEqual(self.read_alias(pinned=True), 'default')
+        self.assertEqual(self.read_alias(wrote=True), 'default')
+
+    def test_only_poll_writes_pin(self):
+        """Saving a session or user does not send the rest of the request to the primary."""
+        with routing() as state:
+            self.router.db_for_write(User)
+            self.assertFalse(state.wrote)
+            self.router.db_for_write(Question)
+            self.assertTrue(state.wrote)
+
+
+@override_settings(POLLS_READ_REPLICAS=['replica1'])
+class ReplicaIndexTests(TestCase):
+    """Test that the cached index is not filled from a lagging replica."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_index_read_from_primary_after_change(self):
+        """Right after a question is added the index pages are read from the primary."""
+        create_question(question_text='new one', days=-1, closed=5)
+        # replica1 is not a configured database, so this only works when read from the primary.
+        response = self.client.get(reverse('polls:index'))
+        self.assertContains(response, 'new one')
+
+
+@override_settings(POLLS_READ_REPLICAS=['replica1'])
+class ReplicaPinningTests(TestCase):
+    """Test that a voter reads its own vote from the primary."""
+
+    def setUp(self):
+        User.objects.create_user(username='lilslimethug', password='12345678')
+        self.client.login(username='lilslimethug', password='12345678')
+        self.question = create_question(question_text='vote me', days=-1, closed=5)
+        self.choice = self.question.choice_set.create(choice_text="first")
+
+    def test_vote_pins_client(self):
+        """The vote response sets the cookie, and the results page then reads the primary."""
+        response = self.client.post(reverse('polls:vote', args=(self.question.id,)), {'choice': self.choice.id})
+        pinned_until = float(response.cookies[ReplicaPinningMiddleware.cookie_name].value)
+        self.assertGreater(pinned_until, time.time())
+        # replica1 is not a configured database, so this only works when read from the primary.
+        response = self.client.get(reverse('polls:results', args=(self.question.id,)))
+        self.assertEqual(response.context['results']['total'], 1)
+
+    @override_settings(POLLS_READ_REPLICAS=[])
+    def test_no_cookie_without_replicas(self):
+        """Without replicas there is nothing to pin."""
+        response = self.client.post(reverse('polls:vote', args=(self.question.id,)), {'choice': self.choice.id})
+        self.assertNotIn(ReplicaPinningMiddleware.cookie_name, response.cookies)
@@ -0,0 +1,39 @@
+"""TEST results page in polls app."""
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from polls.votes import cast_vote
+from polls.test.utils import create_question
+
+
+class ResultsViewTests(TestCase):
+    """Test the results page and its JSON rendering."""
+
+    def setUp(self):
+        self.question = create_question(question_text='vote me', days=-1, closed=5)
+        self.choices = [self.question.choice_set.create(choice_text=f"choice {i}") for i in range(10)]
+        for i in range(4):
+            user = User.objects.create_user(username=f'user{i}', password='12345678')
+            cast_vote(self.question, self.choices[i % 2], user)
+
+    def test_results_json(self):
+        """The JSON results carry the counts, percentages and total."""
+        response = self.client.get(reverse('polls:results_json', args=(self.question.id,)))
+        data = response.json()
+        self.assertEqual(data['total'], 4)
+        self.assertEqual(len(data['choices']), 10)
+        self.assertEqual(data['choices'][0]['votes'], 2)
+        self.assertEqual(data['choices'][0]['percent'], 50.0)
+        self.assertEqual(data['choices'][2]['percent'], 0.0)
+
+    def test_results_query_count_does_not_grow_with_choices(self):
+        """The results page costs the question and one choice query."""
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('polls:results', args=(self.question.id,)))
+        self.assertContains(response, "50.0%")
+
+    def test_results_missing_question(self):
+        """Results of an unknown question return 404."""
+        response = self.client.get(reverse('polls:results_json', args=(999,)))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,130 @@
+"""TEST poll open/close schedule in polls app."""
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from polls.models import Question, Vote
+from polls.schedule import PollSchedule, poll_closed, poll_opened, schedule
+from polls.votes import PollClosed, cast_vote
+from polls.test.utils import create_question
+
+
+class PollScheduleTests(TestCase):
+    """Test the in-memory schedule of open and closed polls."""
+
+    def setUp(self):
+        schedule.reset()
+
+    def test_states(self):
+        """Open, future and closed polls are told apart, unknown ones give None."""
+        opened = create_question(question_text="Open.", days=-1, closed=1)
+        future = create_question(question_text="Future.", days=1, closed=2)
+        closed = create_question(question_text="Closed.", days=-2, closed=-1)
+        self.assertIs(schedule.is_open(opened.id), True)
+        self.assertIs(schedule.is_open(future.id), False)
+        self.assertIs(schedule.is_open(closed.id), False)
+        self.assertIsNone(schedule.is_open(closed.id + 100))
+
+    def test_lookup_without_query(self):
+        """Once loaded, lookups do not query the database."""
+        question = create_question(question_text="Open.", days=-1, closed=1)
+        schedule.is_open(question.id)
+        with self.assertNumQueries(0):
+            self.assertTrue(schedule.is_open(question.id))
+
+    def test_transitions_send_signals(self):
+        """Polls open and close on time and signal it."""
+        hub = PollSchedule()
+        now = timezone.now()
+        question = Question.objects.create(question_text="Soon.", pub_date=now + datetime.timedelta(minutes=1),
+                                           end_date=now + datetime.timedelta(minutes=2))
+        opened, closed = mock.Mock(), mock.Mock()
+        poll_opened.connect(opened)
+        poll_closed.connect(closed)
+        self.addCleanup(poll_opened.disconnect, opened)
+        self.addCleanup(poll_closed.disconnect, closed)
+        self.assertFalse(hub.is_open(question.id))
+        with mock.patch('django.utils.timezone.now', return_value=now + datetime.timedelta(seconds=90)):
+            self.assertTrue(hub.is_open(question.id))
+        opened.assert_called_once_with(signal=poll_opened, sender=Question, question_id=question.id)
+        with mock.patch('django.utils.timezone.now', return_value=now + datetime.timedelta(minutes=3)):
+            self.assertFalse(hub.is_open(question.id))
+        closed.assert_called_once_with(signal=poll_closed, sender=Question, question_id=question.id)
+
+    def test_save_updates_schedule(self):
+        """Changing the dates of a question changes its state at once."""
+        question = create_question(question_text="Open.", days=-1, closed=1)
+        self.assertTrue(schedule.is_open(question.id))
+        question.end_date = timezone.now() - datetime.timedelta(hours=1)
+        question.save()
+        self.assertFalse(schedule.is_open(question.id))
+
+    def test_closed_poll_refuses_vote(self):
+        """Votes on a closed poll are refused."""
+        User.objects.create_user(username='lilslimethug', password='12345678')
+        self.client.login(username='lilslimethug', password='12345678')
+        question = create_question(question_text="Closed.", days=-2, closed=-1)
+        choice = question.choice_set.create(choice_text="late")
+        response = self.client.post(reverse('polls:vote', args=(question.id,)), {'choice': choice.id})
+        self.assertRedirects(response, reverse('polls:index'))
+        self.assertFalse(Vote.objects.exists())
+
+    def test_edit_from_another_process(self):
+        """A poll closed or reopened elsewhere is judged by its row, not the stale schedule."""
+        User.objects.create_user(username='lilslimethug', password='12345678')
+        self.client.login(username='lilslimethug', password='12345678')
+        question = create_question(question_text="Open.", days=-1, closed=1)
+        choice = question.choice_set.create(choice_text="yes")
+        url = reverse('polls:vote', args=(question.id,))
+        self.assertTrue(schedule.is_open(question.id))
+        # update() sends no post_save, like a save made by another process.
+        Question.objects.filter(pk=question.id).update(end_date=timezone.now() - datetime.timedelta(hours=1))
+        self.assertRedirects(self.client.post(url, {'choice': choice.id}), reverse('polls:index'))
+        self.assertFalse(Vote.objects.exists())
+        Question.objects.filter(pk=question.id).update(end_date=timezone.now() + datetime.timedelta(hours=1))
+        response = self.client.post(url, {'choice': choice.id})
+        self.assertRedirects(response, reverse('polls:results', args=(question.id,)))
+        self.assertEqual(Vote.objects.count(), 1)
+
+    def test_cast_vote_checks_row(self):
+        """cast_vote refuses a poll whose row says it is closed."""
+        question = create_question(question_text="Closed.", days=-2, closed=-1)
+        choice = question.choice_set.create(choice_text="late")
+        with self.assertRaises(PollClosed):
+            cast_vote(question, choice, User.objects.create_user(username='lilslimethug'))
+
+    def test_reload_signals_transitions(self):
+        """Transitions found by a reload are signalled, so the index is invalidated."""
+        hub = PollSchedule()
+        question = create_question(question_text="Open.", days=-1, closed=1)
+        self.assertTrue(hub.is_open(question.id))
+        # Saved by another process, which moves modified too.
+        Question.objects.filter(pk=question.id).update(end_date=timezone.now() - datetime.timedelta(hours=1),
+                                                       modified=timezone.now())
+        closed = mock.Mock()
+        poll_closed.connect(closed)
+        self.addCleanup(poll_closed.disconnect, closed)
+        with self.settings(POLLS_SCHEDULE_RELOAD=0):
+            self.assertFalse(hub.is_open(question.id))
+        closed.assert_called_once_with(signal=poll_closed, sender=Question, question_id=question.id)
+
+    def test_reload_reads_modified_questions(self):
+        """A reload only reads the questions modified since the previous one."""
+        hub = PollSchedule()
+        old = create_question(question_text="Old.", days=-1, closed=1)
+        edited = create_question(question_text="Edited.", days=-1, closed=1)
+        self.assertTrue(hub.is_open(old.id))
+        Question.objects.filter(pk=old.id).update(modified=timezone.now() - datetime.timedelta(hours=1))
+        Question.objects.filter(pk=edited.id).update(end_date=timezone.now() - datetime.timedelta(hours=1),
+                                                     modified=timezone.now())
+        with self.settings(POLLS_SCHEDULE_RELOAD=0), CaptureQueriesContext(connection) as queries:
+            self.assertFalse(hub.is_open(edited.id))
+        self.assertTrue(hub.is_open(old.id))
+        self.assertEqual(len(queries), 1)
+        self.assertIn('modified', queries[0]['sql'])
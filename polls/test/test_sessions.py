@@ -0,0 +1,35 @@
+"""TEST cached sessions and users in polls app."""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from polls.auth import user_cache_key
+from polls.test.utils import create_question
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+                   AUTHENTICATION_BACKENDS=['polls.auth.CachedModelBackend'])
+class CachedSessionTests(TestCase):
+    """Test the session and user fast path."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='lilslimethug', password='12345678')
+        self.question = create_question(question_text='vote me', days=-1, closed=5)
+        self.url = reverse('polls:detail', args=(self.question.id,))
+        self.client.force_login(self.user)
+        self.client.get(self.url)
+
+    def test_detail_without_session_or_user_query(self):
+        """A warm session and user leave only the question query."""
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+    def test_saved_user_dropped_from_cache(self):
+        """Deactivating a user logs them out on the next request."""
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.pk)))
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        self.assertEqual(self.client.get(self.url).status_code, 302)
@@ -0,0 +1,91 @@
+"""TEST sharded vote counters in polls app."""
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from polls.models import Choice, ChoiceShard, Vote
+from polls.results import get_results
+from polls.votes import cast_vote
+from polls.test.utils import create_question
+
+
+class ShardedCounterTests(TestCase):
+    """Test the counter shards and their compaction."""
+
+    def setUp(self):
+        self.question = create_question(question_text='busy poll', days=-1, closed=5, counter_shards=4)
+        self.first = self.question.choice_set.create(choice_text="first")
+        self.second = self.question.choice_set.create(choice_text="second")
+        self.users = [User.objects.create_user(username=f'voter{i}') for i in range(10)]
+
+    def test_votes_counted_on_shards(self):
+        """Votes of a sharded poll go to the shards and are summed on read."""
+        for user in self.users:
+            cast_vote(self.question, self.first, user)
+        cast_vote(self.question, self.second, self.users[0])
+        self.assertEqual(Choice.objects.get(pk=self.first.pk).vote_count, 0)
+        self.assertLessEqual(ChoiceShard.objects.filter(choice=self.first).count(), 4)
+        results = get_results(self.question)
+        self.assertEqual([choice['votes'] for choice in results['choices']], [9, 1])
+        self.assertEqual(Choice.objects.get(pk=self.first.pk).votes, 9)
+
+    def test_results_page_queries_with_shards(self):
+        """Results of a sharded poll cost the same few queries however many choices it has."""
+        for i in range(8):
+            self.question.choice_set.create(choice_text=f"extra {i}")
+        for user in self.users:
+            cast_vote(self.question, self.first, user)
+        caches['template_fragments'].clear()
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('polls:results', args=(self.question.id,)))
+        self.assertContains(response, "<td>10 </td>")
+        with self.assertNumQueries(1):
+            votes = [choice.votes for choice in self.question.choice_set.with_votes().order_by('id')]
+        self.assertEqual(votes[:2], [10, 0])
+
+    def test_compaction(self):
+        """Compacting folds the shards into the tally without changing the results."""
+        for user in self.users:
+            cast_vote(self.question, self.first, user)
+        call_command('compactcounters', stdout=StringIO())
+        self.assertEqual(Choice.objects.get(pk=self.first.pk).vote_count, 10)
+        self.assertFalse(ChoiceShard.objects.exclude(count=0).exists())
+        self.assertEqual(get_results(self.question)['total'], 10)
+        call_command('rebuildtallies', check=True, stdout=StringIO())
+
+
+class ConcurrentVoteTests(TransactionTestCase):
+    """Test that parallel votes keep the tallies exact."""
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("In-memory SQLite cannot take concurrent writers; set TEST_DATABASE_NAME to a file.")
+
+    def test_parallel_votes(self):
+        """Every vote sent at once from many clients is counted exactly once."""
+        question = create_question(question_text='busy poll', days=-1, closed=5, counter_shards=8)
+        choices = [question.choice_set.create(choice_text=f"choice {i}") for i in range(2)]
+        users = [User.objects.create_user(username=f'voter{i}') for i in range(40)]
+
+        def vote(user):
+            client = Client()
+            client.force_login(user)
+            try:
+                for choice in (choices[0], choices[1], choices[user.pk % 2]):
+                    response = client.post(reverse('polls:vote', args=(question.id,)), {'choice': choice.id})
+                    self.assertEqual(response.status_code, 302)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(vote, users))
+        self.assertEqual(Vote.objects.count(), 40)
+        tallies = [choice['votes'] for choice in get_results(question)['choices']]
+        expected = [sum(1 for user in users if user.pk % 2 == i) for i in range(2)]
+        self.assertEqual(tallies, expected)
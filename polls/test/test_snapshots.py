@@ -0,0 +1,84 @@
+"""TEST frozen results of closed polls in polls app."""
+import datetime
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from polls.models import Choice, PollSnapshot, Vote
+from polls.snapshots import results_for, snapshot_cache
+from polls.votes import cast_vote
+from polls.test.utils import create_question
+
+
+class SnapshotTests(TestCase):
+    """Test the finalization of closed polls."""
+
+    def setUp(self):
+        snapshot_cache.clear()
+        self.user = User.objects.create_user(username='lilslimethug', password='12345678')
+        self.question = create_question(question_text='vote me', days=-5, closed=5)
+        self.choice = self.question.choice_set.create(choice_text="first")
+        cast_vote(self.question, self.choice, self.user)
+        self.question.end_date = timezone.now() - datetime.timedelta(days=1)
+        self.question.save()
+
+    def test_closed_results_frozen(self):
+        """finalizepolls freezes the results, and reads come from memory without writing."""
+        call_command('finalizepolls', stdout=StringIO())
+        self.assertEqual(PollSnapshot.objects.get(question=self.question).results['total'], 1)
+        Choice.objects.filter(pk=self.choice.pk).update(vote_count=7)
+        self.assertEqual(results_for(self.question)['total'], 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(results_for(self.question)['total'], 1)
+
+    def test_read_does_not_write(self):
+        """Reading the results of a closed poll without a snapshot writes nothing."""
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(results_for(self.question)['total'], 1)
+        self.assertTrue(all(query['sql'].startswith('SELECT') for query in captured))
+        self.assertFalse(PollSnapshot.objects.exists())
+
+    def test_purged_poll_cannot_reopen(self):
+        """A purged poll refuses a new end date and every vote."""
+        call_command('finalizepolls', purge_votes=True, stdout=StringIO())
+        self.question.end_date = timezone.now() + datetime.timedelta(days=1)
+        with self.assertRaises(ValidationError):
+            self.question.full_clean()
+        self.question.save()
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('polls:vote', args=(self.question.id,)), {'choice': self.choice.id})
+        self.assertRedirects(response, reverse('polls:index'))
+        self.assertEqual(Choice.objects.get(pk=self.choice.pk).vote_count, 1)
+
+    def test_open_poll_not_frozen(self):
+        """Open polls are tallied live."""
+        question = create_question(question_text='still open', days=-1, closed=5)
+        results_for(question)
+        self.assertFalse(PollSnapshot.objects.filter(question=question).exists())
+
+    def test_edit_refreshes_snapshot(self):
+        """Editing a closed question freezes its results again."""
+        results_for(self.question)
+        self.question.question_text = 'renamed'
+        self.question.save()
+        response = self.client.get(reverse('polls:results_json', args=(self.question.id,)))
+        self.assertEqual(response.json()['question_text'], 'renamed')
+
+    def test_finalize_and_purge_votes(self):
+        """finalizepolls --purge-votes drops the votes, and rebuildtallies keeps the tallies."""
+        out = StringIO()
+        call_command('finalizepolls', purge_votes=True, stdout=out)
+        self.assertIn("Finalized 1 polls.", out.getvalue())
+        self.assertIn("Purged 1 votes.", out.getvalue())
+        self.assertFalse(Vote.objects.filter(question=self.question).exists())
+        call_command('rebuildtallies', check=True, stdout=StringIO())
+        self.assertEqual(Choice.objects.get(pk=self.choice.pk).vote_count, 1)
+        response = self.client.get(reverse('polls:results', args=(self.question.id,)))
+        self.assertEqual(response.context['results']['total'], 1)
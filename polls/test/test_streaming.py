@@ -0,0 +1,106 @@
+"""TEST live results stream in polls app."""
+import asyncio
+import json
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from polls.streaming import ResultsBroadcaster, broadcaster, with_results_stream
+from polls.votes import cast_vote
+from polls.test.utils import create_question
+
+
+def stream_scope(question_id):
+    return {'type': 'http', 'method': 'GET', 'path': f'/polls/{question_id}/results/stream/', 'headers': []}
+
+
+def read_event(message):
+    name, data = message['body'].decode().strip().split('\n')
+    return name[len('event: '):], json.loads(data[len('data: '):])
+
+
+@override_settings(POLLS_STREAM_MAX_RATE=50, POLLS_STREAM_REFRESH=60)
+class ResultsStreamTests(TestCase):
+    """Test the Server-Sent Events results stream."""
+
+    def setUp(self):
+        self.question = create_question(question_text='vote me', days=-1, closed=5)
+        self.choice = self.question.choice_set.create(choice_text="first")
+        self.user = User.objects.create_user(username='lilslimethug', password='12345678')
+        self.django_app = mock.AsyncMock()
+        self.app = with_results_stream(self.django_app)
+
+    def test_stream_pushes_new_tally(self):
+        """Watchers get the current results, then the results after a vote."""
+        @sync_to_async
+        def vote():
+            cast_vote(self.question, self.choice, self.user)
+            # TestCase never commits, so flag the poll as the on_commit hook would.
+            broadcaster.mark_dirty([self.question.id])
+
+        async def watch():
+            client = ApplicationCommunicator(self.app, stream_scope(self.question.id))
+            await client.send_input({'type': 'http.request', 'body': b''})
+            start = await client.receive_output(timeout=5)
+            first = read_event(await client.receive_output(timeout=5))
+            await vote()
+            second = read_event(await client.receive_output(timeout=5))
+            await client.send_input({'type': 'http.disconnect'})
+            await client.wait(timeout=5)
+            return start, first, second
+        start, first, second = async_to_sync(watch)()
+        self.assertEqual(start['status'], 200)
+        self.assertEqual(first[0], 'results')
+        self.assertEqual(first[1]['total'], 0)
+        self.assertEqual(second[1]['total'], 1)
+        self.assertNotIn(self.question.id, broadcaster._tickers)
+
+    def test_subscribers_share_one_computation(self):
+        """Every watcher of a poll gets the payload of a single computation."""
+        async def watch_twice(hub):
+            first = await hub.subscribe(self.question.id)
+            second = await hub.subscribe(self.question.id)
+            payloads = await first.get(), await second.get()
+            hub.unsubscribe(self.question.id, first)
+            hub.unsubscribe(self.question.id, second)
+            return payloads
+
+        hub = ResultsBroadcaster()
+        with mock.patch.object(ResultsBroadcaster, '_compute', wraps=hub._compute) as compute:
+            first, second = async_to_sync(watch_twice)(hub)
+        self.assertEqual(compute.call_count, 1)
+        self.assertIs(first, second)
+
+    def test_concurrent_subscribers_start_one_ticker(self):
+        """Watchers arriving while the first results are computed share its ticker."""
+        async def watch_at_once(hub):
+            queues = await asyncio.gather(*(hub.subscribe(self.question.id) for _ in range(3)))
+            tickers = [task for task in asyncio.all_tasks() if task.get_coro().__name__ == '_tick']
+            for queue in queues:
+                hub.unsubscribe(self.question.id, queue)
+            return len(tickers)
+
+        hub = ResultsBroadcaster()
+        with mock.patch.object(ResultsBroadcaster, '_compute', wraps=hub._compute) as compute:
+            tickers = async_to_sync(watch_at_once)(hub)
+        self.assertEqual(compute.call_count, 1)
+        self.assertEqual(tickers, 1)
+        self.assertEqual(hub._tickers, {})
+
+    def test_unknown_poll(self):
+        """Streaming an unknown poll returns 404."""
+        async def watch():
+            client = ApplicationCommunicator(self.app, stream_scope(999))
+            await client.send_input({'type': 'http.request', 'body': b''})
+            return await client.receive_output(timeout=5)
+
+        self.assertEqual(async_to_sync(watch)()['status'], 404)
+
+    def test_other_paths_go_to_django(self):
+        """Everything except the stream is passed to the Django application."""
+        scope = {'type': 'http', 'method': 'GET', 'path': '/polls/', 'headers': []}
+        async_to_sync(self.app)(scope, mock.AsyncMock(), mock.AsyncMock())
+        self.django_app.assert_awaited_once()
@@ -0,0 +1,78 @@
+"""TEST the batch survey submission of polls app."""
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from polls.models import Choice, Vote
+from polls.test.utils import create_question
+
+
+@mock.patch('polls.votes.transaction.on_commit', side_effect=lambda func: func())
+class SurveyTests(TestCase):
+    """Test voting on many questions in one request."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='tester', password='12345')
+        self.client.login(username='tester', password='12345')
+        self.open = create_question(question_text='open', days=-1, closed=5)
+        self.other = create_question(question_text='other', days=-1, closed=5)
+        self.closed = create_question(question_text='closed', days=-5, closed=-1)
+        self.open_choice = self.open.choice_set.create(choice_text='yes')
+        self.other_choice = self.other.choice_set.create(choice_text='no')
+        self.closed_choice = self.closed.choice_set.create(choice_text='late')
+
+    def post(self, votes, strict=False):
+        return self.client.post(reverse('polls:survey'), json.dumps({'votes': votes, 'strict': strict}),
+                                content_type='application/json')
+
+    def test_valid_answers_saved_despite_errors(self, on_commit):
+        """The valid answers are saved and every invalid one is reported."""
+        response = self.post({self.open.id: self.open_choice.id, self.other.id: self.open_choice.id,
+                              self.closed.id: self.closed_choice.id, 9999: self.open_choice.id, 'x': 1})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['saved'], {str(self.open.id): self.open_choice.id})
+        self.assertEqual(set(body['errors']), {str(self.other.id), str(self.closed.id), '9999', 'x'})
+        self.assertEqual(Vote.objects.get(user=self.user).choice, self.open_choice)
+        self.assertEqual(Choice.objects.get(pk=self.open_choice.pk).votes, 1)
+
+    def test_strict_saves_nothing_on_error(self, on_commit):
+        """In strict mode one invalid answer rejects the whole survey."""
+        response = self.post({self.open.id: self.open_choice.id, self.closed.id: self.closed_choice.id},
+                             strict=True)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Vote.objects.exists())
+
+    def test_strict_flag_parsed(self, on_commit):
+        """Only a true flag makes the survey strict, not any non-empty value."""
+        closed_vote = {f'vote-{self.open.id}': self.open_choice.id, f'vote-{self.closed.id}': self.closed_choice.id}
+        for value in ('0', 'false', ''):
+            response = self.client.post(reverse('polls:survey'), {**closed_vote, 'strict': value})
+            self.assertEqual(response.status_code, 200, value)
+        response = self.client.post(reverse('polls:survey'), {**closed_vote, 'strict': 'on'})
+        self.assertEqual(response.status_code, 400)
+        response = self.post({self.open.id: self.open_choice.id, self.closed.id: 1}, strict='false')
+        self.assertEqual(response.status_code, 200)
+
+    def test_form_post_changes_votes(self, on_commit):
+        """A form post with vote-<id> fields saves and later changes the votes."""
+        second = self.open.choice_set.create(choice_text='maybe')
+        self.client.post(reverse('polls:survey'), {f'vote-{self.open.id}': self.open_choice.id,
+                                                   f'vote-{self.other.id}': self.other_choice.id})
+        response = self.client.post(reverse('polls:survey'), {f'vote-{self.open.id}': second.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Vote.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Choice.objects.get(pk=self.open_choice.pk).votes, 0)
+        self.assertEqual(Choice.objects.get(pk=second.pk).votes, 1)
+
+    def test_queries_do_not_grow_with_questions(self, on_commit):
+        """A survey of 20 questions runs a constant number of queries."""
+        questions = [create_question(question_text=f'q{i}', days=-1, closed=5) for i in range(20)]
+        votes = {question.id: question.choice_set.create(choice_text='a').id for question in questions}
+        self.post({self.open.id: self.open_choice.id})
+        with self.assertNumQueries(13):
+            response = self.post(votes)
+        self.assertEqual(len(response.json()['saved']), 20)
@@ -0,0 +1,69 @@
+"""TEST stored vote tallies in polls app."""
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from polls.models import Choice, Vote
+from polls.test.utils import create_question
+
+
+class VoteTallyTests(TestCase):
+    """Test the tallies kept on Choice."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='lilslimethug', password='12345678')
+        self.client.login(username='lilslimethug', password='12345678')
+        self.question = create_question(question_text='vote me', days=-1, closed=5)
+        self.first = self.question.choice_set.create(choice_text="first")
+        self.second = self.question.choice_set.create(choice_text="second")
+
+    def vote(self, choice):
+        return self.client.post(reverse('polls:vote', args=(self.question.id,)), {'choice': choice.id})
+
+    def test_vote_increments_tally(self):
+        """A new vote adds one to the selected choice."""
+        self.vote(self.first)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.votes, 1)
+
+    def test_change_vote_moves_tally(self):
+        """Changing the vote moves it from the old choice to the new one."""
+        self.vote(self.first)
+        self.vote(self.second)
+        self.vote(self.second)
+        self.assertEqual(Choice.objects.get(pk=self.first.id).votes, 0)
+        self.assertEqual(Choice.objects.get(pk=self.second.id).votes, 1)
+
+    def test_rebuild_fixes_drift(self):
+        """rebuildtallies recounts the tallies from the Vote rows."""
+        self.vote(self.first)
+        Choice.objects.filter(pk=self.first.id).update(vote_count=7)
+        with self.assertRaises(CommandError):
+            call_command('rebuildtallies', check=True, stdout=StringIO())
+        call_command('rebuildtallies', stdout=StringIO())
+        self.assertEqual(Choice.objects.get(pk=self.first.id).votes, 1)
+        call_command('rebuildtallies', check=True, stdout=StringIO())
+
+    def test_rebuild_locks_before_counting(self):
+        """rebuildtallies reads the choices and their shards, under lock, before it counts the votes."""
+        self.vote(self.first)
+        with CaptureQueriesContext(connection) as queries:
+            call_command('rebuildtallies', check=True, stdout=StringIO())
+        tables = [query['sql'].split(' FROM ', 1)[1].split()[0] for query in queries.captured_queries
+                  if query['sql'].startswith('SELECT') and ' FROM ' in query['sql']]
+        self.assertLess(tables.index('"polls_choice"'), tables.index('"polls_vote"'))
+        self.assertLess(tables.index('"polls_choiceshard"'), tables.index('"polls_vote"'))
+
+    def test_one_vote_row_per_user(self):
+        """Voting again updates the same row, and a second row is refused by the database."""
+        self.vote(self.first)
+        self.vote(self.second)
+        self.assertEqual(Vote.objects.filter(question=self.question, user=self.user).count(), 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Vote.objects.create(question=self.question, choice=self.first, user=self.user)
@@ -0,0 +1,74 @@
+"""TEST throttling of the vote, login and results views in polls app."""
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from polls.models import Vote
+from polls.throttle import take_token
+from polls.test.utils import create_question
+
+RATES = {
+    'vote': {'user': (1, 60), 'ip': (100, 60)},
+    'login': {'user': (2, 60), 'ip': (100, 60)},
+    'results': {'user': (100, 60), 'ip': (3, 60)},
+}
+
+
+@override_settings(POLLS_THROTTLE_ENABLED=True, POLLS_THROTTLE_RATES=RATES)
+class ThrottleTests(TestCase):
+    """Test the token buckets and the 429 responses."""
+
+    def setUp(self):
+        caches['throttle'].clear()
+        self.user = User.objects.create_user(username='lilslimethug', password='12345678')
+        self.question = create_question(question_text='vote me', days=-1, closed=5)
+        self.choice = self.question.choice_set.create(choice_text="first")
+
+    def test_bucket_refills(self):
+        """An empty bucket lets a request through again once a token has refilled."""
+        self.assertEqual(take_token('login', {'user': 'x'}, now=100), 0)
+        self.assertEqual(take_token('login', {'user': 'x'}, now=100), 0)
+        self.assertEqual(take_token('login', {'user': 'x'}, now=100), 30)
+        self.assertEqual(take_token('login', {'user': 'x'}, now=130), 0)
+
+    def test_vote_throttled_without_writes(self):
+        """A second vote within the budget period gets 429 and writes nothing."""
+        self.client.force_login(self.user)
+        url = reverse('polls:vote', args=(self.question.id,))
+        self.client.post(url, {'choice': self.choice.id})
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(url, {'choice': self.choice.id})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertFalse([query for query in captured.captured_queries if not query['sql'].startswith('SELECT')])
+        self.assertEqual(Vote.objects.count(), 1)
+
+    def test_login_throttled_per_username(self):
+        """Guessing the password of one user is stopped, but only for that user."""
+        for _ in range(2):
+            self.client.post(reverse('login'), {'username': 'lilslimethug', 'password': '666'})
+        response = self.client.post(reverse('login'), {'username': 'lilslimethug', 'password': '12345678'})
+        self.assertEqual(response.status_code, 429)
+        response = self.client.post(reverse('login'), {'username': 'someone', 'password': '666'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_lockout_per_address(self):
+        """Failed logins from one address do not lock the user out elsewhere."""
+        for _ in range(3):
+            self.client.post(reverse('login'), {'username': 'lilslimethug', 'password': '666'}, REMOTE_ADDR='10.0.0.5')
+        response = self.client.post(reverse('login'), {'username': 'lilslimethug', 'password': '12345678'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_results_throttled_per_ip(self):
+        """Anonymous results requests share the budget of their IP."""
+        url = reverse('polls:results', args=(self.question.id,))
+        for _ in range(3):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(url).status_code, 429)
+        # A client cannot escape its budget by making up X-Forwarded-For.
+        self.assertEqual(self.client.get(url, HTTP_X_FORWARDED_FOR='10.0.0.2').status_code, 429)
+        with self.settings(POLLS_TRUSTED_PROXIES=['127.0.0.1']):
+            self.assertEqual(self.client.get(url, HTTP_X_FORWARDED_FOR='10.0.0.2').status_code, 200)
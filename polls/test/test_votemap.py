@@ -0,0 +1,51 @@
+"""TEST per-user vote map in polls app."""
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+
+from polls.votemap import SESSION_KEY
+from polls.votes import cast_vote
+from polls.test.utils import create_question
+
+
+class VoteMapTests(TestCase):
+    """Test the previous vote kept in the session."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='lilslimethug', password='12345678')
+        self.question = create_question(question_text='vote me', days=-1, closed=5)
+        self.first = self.question.choice_set.create(choice_text="first")
+        self.second = self.question.choice_set.create(choice_text="second")
+
+    def detail(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('polls:detail', args=(self.question.id,)))
+        self.assertFalse([query for query in captured.captured_queries if 'polls_vote' in query['sql']])
+        return response
+
+    def test_map_loaded_at_login(self):
+        """Votes from before the login are shown without reading polls_vote."""
+        cast_vote(self.question, self.first, self.user)
+        self.client.login(username='lilslimethug', password='12345678')
+        self.assertEqual(self.client.session[SESSION_KEY], {str(self.question.id): self.first.id})
+        self.assertEqual(self.detail().context['previous_vote'], "first")
+
+    def test_map_updated_on_vote(self):
+        """A vote changes the previous vote shown on the detail page."""
+        self.client.login(username='lilslimethug', password='12345678')
+        self.assertEqual(self.detail().context['previous_vote'], "You did not vote yet.")
+        self.client.post(reverse('polls:vote', args=(self.question.id,)), {'choice': self.second.id})
+        self.assertEqual(self.detail().context['previous_vote'], "second")
+
+    def test_map_filled_for_old_session(self):
+        """A session without the map gets it filled on the first detail page."""
+        cast_vote(self.question, self.second, self.user)
+        self.client.login(username='lilslimethug', password='12345678')
+        session = self.client.session
+        del session[SESSION_KEY]
+        session.save()
+        response = self.client.get(reverse('polls:detail', args=(self.question.id,)))
+        self.assertEqual(response.context['previous_vote'], "second")
+        self.assertIn(SESSION_KEY, self.client.session)
@@ -0,0 +1,87 @@
+"""Helpers for the polls tests."""
+import datetime
+import functools
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from polls.models import Question
+
+
+def create_question(question_text, days, closed, **fields):
+    """
+    For create a question published `days` from now and closed `closed` days from now.
+
+    :param fields: other Question fields, e.g. counter_shards
+    :return: the saved question
+    """
+    time = timezone.now() + datetime.timedelta(days=days)
+    closed = timezone.now() + datetime.timedelta(days=closed)
+    return Question.objects.create(question_text=question_text, pub_date=time, end_date=closed, **fields)
+
+
+class PollsTestRunner(DiscoverRunner):
+    """
+    For run the tests with throttling off, as they share users and the client IP.
+
+    A file cache gets a directory of its own, so the tests never read or clear
+    the entries of a development server using the same settings.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        changes = {'POLLS_THROTTLE_ENABLED': False}
+        self.cache_dir = None
+        default = settings.CACHES['default']
+        if default['BACKEND'] == 'django.core.cache.backends.filebased.FileBasedCache':
+            self.cache_dir = tempfile.mkdtemp(prefix='ku-polls-test-cache-')
+            changes['CACHES'] = {**settings.CACHES, 'default': {**default, 'LOCATION': self.cache_dir}}
+        self.test_settings = override_settings(**changes)
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        if self.cache_dir is not None:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
+
+
+class QueryBudgetMixin:
+    """For TestCase classes that put an upper bound on the queries of a view."""
+
+    @contextmanager
+    def assertMaxQueries(self, limit, using=DEFAULT_DB_ALIAS):
+        """
+        For fail the test when the block runs more than limit queries.
+
+        :param limit: most queries the block may run
+        :param using: database alias to count
+        """
+        with CaptureQueriesContext(connections[using]) as captured:
+            yield captured
+        executed = len(captured)
+        if executed > limit:
+            statements = '\n'.join(f"{i}. {query['sql']}" for i, query in enumerate(captured.captured_queries, 1))
+            self.fail(f"{executed} queries executed, budget is {limit}\n{statements}")
+
+
+def query_budget(limit, using=DEFAULT_DB_ALIAS):
+    """
+    For declare the query budget of a whole test method.
+
+    :param limit: most queries the test may run
+    :param using: database alias to count
+    """
+    def decorator(test):
+        @functools.wraps(test)
+        def wrapper(self, *args, **kwargs):
+            with QueryBudgetMixin.assertMaxQueries(self, limit, using):
+                return test(self, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,53 @@
+"""Token bucket throttling of the vote, login and results views."""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Throttled views by URL name, with the scope whose budget they use and the methods it applies to.
+THROTTLED_VIEWS = {
+    'polls:vote': ('vote', None),
+    'polls:survey': ('vote', None),
+    'polls:results': ('results', ('GET', 'HEAD')),
+    'polls:results_json': ('results', ('GET', 'HEAD')),
+    'login': ('login', ('POST',)),
+}
+
+_lock = threading.Lock()
+
+
+def take_token(scope, keys, now=None):
+    """
+    For spend one token of every bucket of a request, or none if any bucket is empty.
+
+    Buckets are stored as (tokens, time) in the throttle cache and refilled
+    lazily when read. A rejected request writes nothing, so hammering a full
+    budget costs only cache reads.
+
+    :param scope: key of POLLS_THROTTLE_RATES
+    :param keys: mapping of bucket kind ('user' or 'ip') to the user or address, None to skip that bucket
+    :param now: current time, for tests
+    :return: 0 if the request may go on, else seconds until it would be let through
+    """
+    now = time.time() if now is None else now
+    cache = caches['throttle']
+    buckets = {}
+    wait = 0.0
+    with _lock:
+        for kind, key in keys.items():
+            if key is None:
+                continue
+            capacity, period = settings.POLLS_THROTTLE_RATES[scope][kind]
+            cache_key = f'polls:throttle:{scope}:{kind}:{key}'
+            tokens, stamp = cache.get(cache_key, (capacity, now))
+            tokens = min(capacity, tokens + (now - stamp) * capacity / period)
+            if tokens < 1:
+                wait = max(wait, (1 - tokens) * period / capacity)
+            buckets[cache_key] = (tokens - 1, period)
+        if wait:
+            return wait
+        # An idle bucket is full again after one period, so it can be dropped then.
+        cache.set_many({cache_key: (tokens, now) for cache_key, (tokens, _) in buckets.items()},
+                       timeout=max((period for _, period in buckets.values()), default=None))
+    return 0
@@ -1,10 +1,29 @@
 """Set path url page."""
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+if settings.POLLS_VIEW_STACK == 'async':
+    index = async_views.index
+    detail = async_views.vote_for_poll
+    results = async_views.results
+    results_json = async_views.results_json
+    vote = async_views.vote
+    survey = async_views.survey
+else:
+    index = views.IndexView.as_view()
+    detail = views.vote_for_poll
+    results = views.ResultsView.as_view()
+    results_json = views.results_json
+    vote = views.vote
+    survey = views.survey_vote
 
 app_name = 'polls'
 urlpatterns = [
-    path('', views.IndexView.as_view(), name='index'),
-    path('<int:pk>/', views.vote_for_poll, name='detail'),
-    path('<int:pk>/results/', views.ResultsView.as_view(), name='results'),
-    path('<int:question_id>/vote/', views.vote, name='vote'), ]
+    path('', index, name='index'),
+    path('<int:pk>/', detail, name='detail'),
+    path('<int:pk>/results/', results, name='results'),
+    path('<int:pk>/results.json', results_json, name='results_json'),
+    path('<int:question_id>/vote/', vote, name='vote'),
+    path('survey/', survey, name='survey'),
+    path('export/', views.export_polls, name='export'), ]
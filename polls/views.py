@@ -1,20 +1,39 @@
 """Views for set and manage page."""
+from django.conf import settings
 from django.contrib.auth import user_logged_out, user_logged_in, user_login_failed
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.db import router
+from django.db.models import F
 from django.dispatch import receiver
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponseRedirect
+from django.http import (Http404, HttpResponse, HttpResponseForbidden, HttpResponseRedirect, JsonResponse,
+                         StreamingHttpResponse)
 from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.utils.functional import SimpleLazyObject
 from django.views import generic
-from django.utils import timezone
+from django.views.decorators.http import condition, require_POST
 from django.contrib import messages
 
-from mysite.settings import LOGGING
-import logging.config
+import hmac
+import json
+import logging
 
-from .models import Question, Choice, Vote
+from .models import Question, Choice
+from .cache import published_questions
+from .clientip import get_client_ip
+from .etags import index_etag, question_for, results_etag, results_last_modified
+from .export import FORMATS, export_lines
+from .ingest import vote_queue
+from .metrics import logins_total, registry
+from .survey import parse_answers, submit, validate
+from .routers import read_from_replica
+from .schedule import schedule
+from .snapshots import results_for
+from .votemap import load_vote_map, previous_choice, remember_vote
+from .votes import PollClosed, cast_vote
 
-logging.config.dictConfig(LOGGING)
 logger = logging.getLogger("polls")
 
 
@@ -27,32 +46,123 @@ def vote(request, question_id):
     :param question_id:
     :return:
     """
-    question = get_object_or_404(Question, pk=question_id)
+    if not poll_is_open(request, question_id):
+        return redirect('polls:index')
+    # The one check of the question row: its dates, and the snapshot flag of a poll
+    # whose votes were purged, as its voters could otherwise vote twice.
+    question = get_object_or_404(Question.objects.annotate(purged=F('snapshot__votes_purged')), pk=question_id)
+    if not question.can_vote() or question.purged:
+        return closed_poll(request, question)
     user = request.user
-    print("current user is", user.id, "login", user.username)
-    print("Real name:", user.first_name, user.last_name)
     try:
         selected_choice = question.choice_set.get(pk=request.POST['choice'])
     except (KeyError, Choice.DoesNotExist):
         # Redisplay the question voting form.
         return render(request, 'polls/detail.html', {
             'question': question,
+            'choices': question.choice_set.all(),
             'error_message': "You didn't select a choice.",
         })
     else:
-        if question.vote_set.filter(user=user).exists():
-            selected_vote = question.vote_set.get(user=user)
-            selected_vote.choice = selected_choice
-            selected_vote.save()
+        if settings.POLLS_VOTE_INGESTION == 'queued':
+            vote_queue.put(question.id, user.id, selected_choice.id)
         else:
-            Vote.objects.update_or_create(question=question, choice=selected_choice, user=request.user)
-        logger.info(f"user: {user.username} has voting on {get_client_ip(request)} ")
+            try:
+                cast_vote(question, selected_choice, user)
+            except PollClosed:
+                return closed_poll(request, question)
+        remember_vote(request, question.id, selected_choice.id)
+        logger.info(f"user: {user.username} has voted on question {question.id}", extra={
+            'event': 'vote', 'user': user.username, 'ip': get_client_ip(request),
+            'question': question.id, 'choice': selected_choice.id,
+        })
         # Always return an HttpResponseRedirect after successfully dealing
         # with POST data. This prevents data from being posted twice if a
         # user hits the Back button.
         return HttpResponseRedirect(reverse('polls:results', args=(question.id,)))
 
 
+@login_required
+@require_POST
+def survey_vote(request):
+    """
+    For vote on many questions at once, all in one transaction.
+
+    The answers come as JSON, {"votes": {question id: choice id}, "strict": false},
+    or as form fields vote-<question id>=<choice id> with an optional strict=1.
+    Invalid answers are reported per question and the valid ones are saved,
+    unless strict is set, in which case nothing is saved.
+
+    :param request:
+    :return: JsonResponse with the saved answers and the errors
+    """
+    if request.content_type == 'application/json':
+        try:
+            body = json.loads(request.body)
+            answers, strict = body.get('votes', {}), body.get('strict') is True
+            if not isinstance(answers, dict):
+                raise ValueError
+        except (ValueError, AttributeError):
+            return JsonResponse({'error': "Expected a JSON object with a votes object."}, status=400)
+    else:
+        answers = {key[len('vote-'):]: value for key, value in request.POST.items() if key.startswith('vote-')}
+        strict = request.POST.get('strict', '').lower() in ('1', 'true', 'on')
+    votes, errors = parse_answers(answers)
+    valid, invalid = validate(votes)
+    errors.update(invalid)
+    if not valid or (strict and errors):
+        return JsonResponse({'saved': {}, 'errors': errors}, status=400)
+    user = request.user
+    submit(user, valid)
+    for question_id, choice_id in valid.items():
+        remember_vote(request, question_id, choice_id)
+    logger.info(f"user: {user.username} has answered {len(valid)} questions", extra={
+        'event': 'survey', 'user': user.username, 'ip': get_client_ip(request),
+        'questions': sorted(valid), 'errors': len(errors),
+    })
+    return JsonResponse({'saved': valid, 'errors': errors})
+
+
+def poll_is_open(request, question_id):
+    """
+    For check from the poll schedule that question can be voted.
+
+    An open poll passes without a query; the view then checks the question row
+    it reads anyway. A poll the schedule of this process thinks closed is
+    checked against its row, in case another process reopened it.
+
+    :param request:
+    :param question_id:
+    :return: True if open; False after adding the error message for a closed poll
+    :raise Http404: if there is no such question
+    """
+    is_open = schedule.is_open(question_id)
+    if is_open is None:
+        raise Http404("No Question matches the given query.")
+    if not is_open:
+        question = Question.objects.filter(pk=question_id).first()
+        if question is not None and question.can_vote():
+            schedule.update(question)
+            return True
+        messages.error(request, f'{"You are not allowed to vote this question"}')
+    return is_open
+
+
+def closed_poll(request, question):
+    """
+    For turn away a vote on a poll closed since this process loaded its schedule.
+
+    :param request:
+    :param question: question just read from the database
+    :return: redirect to the index with the error message
+    """
+    schedule.update(question)
+    messages.error(request, f'{"You are not allowed to vote this question"}')
+    return redirect('polls:index')
+
+
+@method_decorator(read_from_replica, name='dispatch')
+@method_decorator(condition(etag_func=index_etag), name='dispatch')
 class IndexView(generic.ListView):
     """For set index page."""
 
@@ -60,10 +170,20 @@ class IndexView(generic.ListView):
     context_object_name = 'latest_question_list'
 
     def get_queryset(self):
-        """Return the last five published questions (not including those set to be published in the future."""
-        return Question.objects.filter(
-            pub_date__lte=timezone.now()
-        ).order_by('-pub_date')
+        """Return one page of the published questions (not including those set to be published in the future)."""
+        self.open_only = bool(self.request.GET.get('open'))
+        try:
+            questions, self.next_cursor = published_questions(self.request.GET.get('after'), self.open_only)
+        except ValueError:
+            raise Http404("Invalid page cursor.")
+        return questions
+
+    def get_context_data(self, **kwargs):
+        """Add the cursor of the next page."""
+        context = super().get_context_data(**kwargs)
+        context['next_cursor'] = self.next_cursor
+        context['open_only'] = self.open_only
+        return context
 
 
 @login_required()
@@ -75,16 +195,24 @@ def vote_for_poll(request, pk):
     :param pk:
     :return: render detail
     """
+    if not poll_is_open(request, pk):
+        return redirect('polls:index')
     user = request.user
     question = get_object_or_404(Question, pk=pk)
-    if question.vote_set.filter(user=user).exists():
-        previous_vote = Vote.objects.filter(question=question, user=request.user).first().choice.choice_text
-    else:
-        previous_vote = "You did not vote yet."
     if not question.can_vote():
-        messages.error(request, f'{"You are not allowed to vote this question"}')
-        return redirect('polls:index')
-    return render(request, 'polls/detail.html', {'question': question, 'previous_vote': previous_vote})
+        return closed_poll(request, question)
+    choice_id = vote_queue.pending_choice(question.id, user.id)
+    if choice_id is None:
+        choice_id = previous_choice(request, question.id)
+    previous_vote = None
+    if choice_id is not None:
+        previous_vote = question.choice_set.filter(pk=choice_id).values_list('choice_text', flat=True).first()
+    # Left unevaluated: the choices are only read when their cached fragment expired.
+    choices = question.choice_set.all()
+    previous_vote = previous_vote or "You did not vote yet."
+    return render(request, 'polls/detail.html', {
+        'question': question, 'choices': choices, 'previous_vote': previous_vote,
+    })
 
 
 # class DetailView(generic.DetailView): //I change from class base view to method base view.
@@ -96,32 +224,107 @@ def vote_for_poll(request, pk):
 #     """
 #     return Question.objects.filter(pub_date__lte=timezone.now())
 
-class ResultsView(generic.DeleteView):
+@method_decorator(read_from_replica, name='dispatch')
+@method_decorator(condition(etag_func=results_etag, last_modified_func=results_last_modified), name='dispatch')
+class ResultsView(generic.DetailView):
     """For set result page."""
 
     model = Question
     template_name = 'polls/results.html'
 
+    def get_object(self, queryset=None):
+        """Return the question already read for the ETag."""
+        question = question_for(self.request, self.kwargs['pk'])
+        if question is None:
+            raise Http404("No Question matches the given query.")
+        return question
 
-def get_client_ip(request):
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
+    def get_context_data(self, **kwargs):
+        """Add the tallied choices of the question, read only if the cached table is missing."""
+        context = super().get_context_data(**kwargs)
+        context['results'] = SimpleLazyObject(lambda: results_for(self.object))
+        context['results_tag'] = results_etag(self.request, self.object.pk)
+        return context
+
+
+@read_from_replica
+@condition(etag_func=results_etag, last_modified_func=results_last_modified)
+def results_json(request, pk):
+    """
+    For return the results of a question as JSON.
+
+    :param request:
+    :param pk:
+    :return: JsonResponse of the tallied choices
+    """
+    question = question_for(request, pk)
+    if question is None:
+        raise Http404("No Question matches the given query.")
+    return JsonResponse(results_for(question))
+
+
+@staff_member_required
+@read_from_replica
+def export_polls(request):
+    """
+    For download the polls archive as a stream, so large tables never sit in memory.
+
+    :param request: GET with format=csv|jsonl and votes=1 for the raw votes
+    :return: StreamingHttpResponse of the export
+    """
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in FORMATS:
+        fmt = 'csv'
+    votes = bool(request.GET.get('votes'))
+    content_type = 'application/x-ndjson' if fmt == 'jsonl' else 'text/csv'
+    # The rows are read while streaming, after this view returned, so pick the database now.
+    using = router.db_for_read(Question)
+    response = StreamingHttpResponse(export_lines(fmt, votes, using), content_type=content_type)
+    filename = f"{'votes' if votes else 'polls'}.{fmt}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def metrics(request):
+    """
+    For let Prometheus scrape the metrics of every worker process.
+
+    :param request: with the POLLS_METRICS_TOKEN bearer token, from an address in
+        POLLS_METRICS_ALLOWED_IPS, or of a staff user
+    :return: metrics in the Prometheus text format
+    """
+    token = settings.POLLS_METRICS_TOKEN
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    allowed = (bool(token) and hmac.compare_digest(authorization, f'Bearer {token}')
+               or request.META.get('REMOTE_ADDR') in settings.POLLS_METRICS_ALLOWED_IPS
+               or request.user.is_staff)
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 @receiver(user_logged_in)
 def logged_in_logging(sender, request, user, **kwargs):
-    logger.info(f"user: {user.username} has logged in to {get_client_ip(request)}")
+    if request is not None and hasattr(request, 'session'):
+        load_vote_map(request, user)
+    logins_total.inc(result='success')
+    logger.info(f"user: {user.username} has logged in", extra={
+        'event': 'login', 'user': user.username, 'ip': get_client_ip(request) if request is not None else None,
+    })
 
 
 @receiver(user_logged_out)
 def logged_out_logging(sender, request, user, **kwargs):
-    logger.info(f"user: {user.username} has logged out from {get_client_ip(request)} ")
+    username = getattr(user, 'username', None)
+    logger.info(f"user: {username} has logged out", extra={
+        'event': 'logout', 'user': username, 'ip': get_client_ip(request) if request is not None else None,
+    })
 
 
 @receiver(user_login_failed)
 def logged_in_failed_logging(sender, request, credentials, **kwargs):
-    logger.warning(f"user: {request.POST['username']} has login failed with {get_client_ip(request)}")
+    username = credentials.get('username')
+    logins_total.inc(result='failure')
+    logger.warning(f"user: {username} has login failed", extra={
+        'event': 'login_failed', 'user': username, 'ip': get_client_ip(request) if request is not None else None,
+    })
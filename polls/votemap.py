@@ -0,0 +1,49 @@
+"""Remember in the session which choice the user voted on each question."""
+from .models import Vote
+
+SESSION_KEY = 'polls_votes'
+
+
+def load_vote_map(request, user):
+    """
+    For read every vote of user into the session with one query.
+
+    :param request: request whose session holds the map
+    :param user:
+    :return: map of question id (as text, for the JSON session serializer) to choice id
+    """
+    vote_map = {str(question_id): choice_id
+                for question_id, choice_id in Vote.objects.filter(user=user).values_list('question_id', 'choice_id')}
+    request.session[SESSION_KEY] = vote_map
+    return vote_map
+
+
+def previous_choice(request, question_id):
+    """
+    For know which choice the user voted on question without reading polls_vote.
+
+    The map is loaded at login; a session from before that is filled here once.
+
+    :param request:
+    :param question_id:
+    :return: choice id, or None if the user did not vote
+    """
+    vote_map = request.session.get(SESSION_KEY)
+    if vote_map is None:
+        vote_map = load_vote_map(request, request.user)
+    return vote_map.get(str(question_id))
+
+
+def remember_vote(request, question_id, choice_id):
+    """
+    For record a new vote in the session map.
+
+    :param request:
+    :param question_id:
+    :param choice_id:
+    """
+    vote_map = request.session.get(SESSION_KEY)
+    if vote_map is None or vote_map.get(str(question_id)) == choice_id:
+        return
+    vote_map[str(question_id)] = choice_id
+    request.session.modified = True
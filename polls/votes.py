@@ -0,0 +1,242 @@
+"""Record votes and keep the per-choice tallies in step with them."""
+import random
+from collections import Counter
+
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .metrics import votes_total
+from .models import Choice, ChoiceShard, Question, Vote
+from .signals import votes_changed
+
+
+class PollClosed(Exception):
+    """Raised when a vote arrives for a poll that is not open."""
+
+
+def adjust_tallies(deltas, shard_counts=None):
+    """
+    Apply vote count changes to the choice tallies.
+
+    Choices of a question with one counter shard are counted on the Choice
+    row itself. With more, the change goes to a random ChoiceShard row of the
+    choice, so concurrent voters on a popular choice rarely wait on the same
+    row lock; compactcounters folds the shards back into Choice.vote_count.
+
+    :param deltas: mapping of choice id to the number of votes to add (may be negative)
+    :param shard_counts: mapping of choice id to the counter_shards of its question, default 1
+    """
+    shard_counts = shard_counts or {}
+    by_delta = {}
+    for choice_id, delta in deltas.items():
+        if choice_id is None or not delta:
+            continue
+        shards = shard_counts.get(choice_id, 1)
+        if shards <= 1:
+            by_delta.setdefault(delta, []).append(choice_id)
+        else:
+            add_to_shard(choice_id, random.randrange(shards), delta)
+    if not by_delta:
+        return
+    # All the unsharded choices move in one statement, so a changed vote or a
+    # whole batch costs one UPDATE however many choices it moves.
+    if len(by_delta) == 1:
+        (change, choice_ids), = by_delta.items()
+    else:
+        change = Case(*(When(pk__in=ids, then=Value(delta)) for delta, ids in by_delta.items()),
+                      output_field=IntegerField())
+        choice_ids = [choice_id for ids in by_delta.values() for choice_id in ids]
+    Choice.objects.filter(pk__in=choice_ids).update(vote_count=F('vote_count') + change)
+
+
+def add_to_shard(choice_id, shard, delta):
+    """
+    Add delta to one counter shard of a choice, creating the row on first use.
+
+    :param choice_id:
+    :param shard: shard number
+    :param delta: votes to add (may be negative)
+    """
+    shard_rows = ChoiceShard.objects.filter(choice_id=choice_id, shard=shard)
+    if shard_rows.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            ChoiceShard.objects.create(choice_id=choice_id, shard=shard, count=delta)
+    except IntegrityError:
+        # Another voter created the row first.
+        shard_rows.update(count=F('count') + delta)
+
+
+def notify_votes_changed(question_ids):
+    """
+    For tell the listeners which questions were voted on, once the transaction commits.
+
+    No question row is written, so voters on the same poll never queue on it:
+    the listeners move the results stamp in the cache (see etags.results_stamp)
+    and the live results streams.
+
+    :param question_ids: ids of the questions voted on
+    """
+    question_ids = frozenset(question_ids)
+    transaction.on_commit(lambda: _votes_committed(question_ids))
+
+
+def _votes_committed(question_ids):
+    votes_changed.send(sender=Vote, question_ids=question_ids)
+
+
+def cast_vote(question, choice, user):
+    """
+    Save the user vote on question and move the tallies with it.
+
+    The vote row of the user is locked and read first, so a repeated vote
+    writes nothing and a changed one updates the row and the tallies once
+    each. The row is inserted only when it is missing; if a concurrent
+    request of the same user inserted it first, the insert gives way and the
+    vote is handled as a change, so the same vote is never counted twice.
+    On SQLite the insert goes first instead, see below.
+
+    :param question:
+    :param choice: selected choice of question
+    :param user:
+    :return: id of the choice the user voted before, or None for a new vote
+    :raise PollClosed: if question, as the caller read it, is not open now or had its votes purged
+    """
+    # The caller has just read the question row (with its purged flag, see views.vote),
+    # so the window is not queried again here.
+    if not question.can_vote() or getattr(question, 'purged', False):
+        raise PollClosed(f"Question {question.pk} is not open for voting.")
+    with transaction.atomic():
+        # SQLite locks the whole database at the first write of a transaction, and a
+        # transaction that read first cannot write once another one has committed. So
+        # there the insert, which does nothing for an existing vote, takes the lock first.
+        insert_first = connections[router.db_for_write(Vote)].vendor == 'sqlite'
+        previous = None if insert_first else voted_choice(question, user)
+        if previous is None:
+            if insert_vote(question, choice, user):
+                adjust_tallies({choice.id: 1}, {choice.id: question.counter_shards})
+                notify_votes_changed([question.id])
+                votes_total.inc(kind='cast')
+                return None
+            previous = voted_choice(question, user)
+        if previous != choice.id:
+            Vote.objects.filter(question=question, user=user).update(choice=choice)
+            adjust_tallies({previous: -1, choice.id: 1},
+                           {previous: question.counter_shards, choice.id: question.counter_shards})
+            notify_votes_changed([question.id])
+            votes_total.inc(kind='changed')
+        return previous
+
+
+def voted_choice(question, user):
+    """
+    Lock the vote of a user on a question and read its choice.
+
+    :param question:
+    :param user:
+    :return: id of the voted choice, or None if the user has not voted
+    """
+    return Vote.objects.select_for_update().filter(
+        question=question, user=user).values_list('choice_id', flat=True).first()
+
+
+def insert_vote(question, choice, user):
+    """
+    Insert the vote of a user, unless the user already has a vote on the question.
+
+    On PostgreSQL and SQLite the unique (question, user) constraint is given
+    way to with ON CONFLICT DO NOTHING, so no savepoint is needed; elsewhere
+    the insert runs in a savepoint that is rolled back on a conflict.
+
+    :param question:
+    :param choice: selected choice of question
+    :param user:
+    :return: True if the vote was inserted, False if the user's vote existed
+    """
+    connection = connections[router.db_for_write(Vote)]
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        try:
+            with transaction.atomic(using=connection.alias):
+                Vote.objects.create(question=question, choice=choice, user=user)
+        except IntegrityError:
+            return False
+        return True
+    quote = connection.ops.quote_name
+    question_column, choice_column, user_column = (
+        quote(Vote._meta.get_field(name).column) for name in ('question', 'choice', 'user'))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(Vote._meta.db_table)} ({question_column}, {choice_column}, {user_column}) "
+            f"VALUES (%s, %s, %s) ON CONFLICT ({question_column}, {user_column}) DO NOTHING",
+            [question.pk, choice.pk, user.pk])
+        return cursor.rowcount == 1
+
+
+def apply_votes(votes):
+    """
+    Save a batch of votes in one transaction and move the tallies with them.
+
+    :param votes: mapping of (question id, user id) to the selected choice id
+    :return: mapping of (question id, user id) to the previously voted choice id, or None
+    """
+    with transaction.atomic():
+        existing = {
+            (vote.question_id, vote.user_id): vote
+            for vote in Vote.objects.select_for_update().filter(
+                question_id__in={question_id for question_id, _ in votes},
+                user_id__in={user_id for _, user_id in votes},
+            ).only('id', 'question_id', 'user_id', 'choice_id')
+        }
+        created, updated, previous = [], [], {}
+        deltas = Counter()
+        question_of = {}
+        for (question_id, user_id), choice_id in votes.items():
+            question_of[choice_id] = question_id
+            vote = existing.get((question_id, user_id))
+            if vote is None:
+                created.append(Vote(question_id=question_id, user_id=user_id, choice_id=choice_id))
+                previous[question_id, user_id] = None
+                deltas[choice_id] += 1
+                continue
+            previous[question_id, user_id] = vote.choice_id
+            if vote.choice_id != choice_id:
+                question_of[vote.choice_id] = question_id
+                deltas[vote.choice_id] -= 1
+                deltas[choice_id] += 1
+                vote.choice_id = choice_id
+                updated.append(vote)
+        Vote.objects.bulk_create(created)
+        Vote.objects.bulk_update(updated, ['choice'])
+        shards = dict(Question.objects.filter(pk__in=set(question_of.values())).exclude(
+            counter_shards=1).values_list('id', 'counter_shards'))
+        adjust_tallies(deltas, {choice_id: shards.get(question_id, 1)
+                                for choice_id, question_id in question_of.items()})
+        notify_votes_changed(question_id for question_id, _ in votes)
+    for vote in created:
+        votes_total.inc(kind='cast')
+    for vote in updated:
+        votes_total.inc(kind='changed')
+    return previous
+
+
+def compact_counters():
+    """
+    Fold the counter shards of every choice into Choice.vote_count.
+
+    Each choice is folded in its own short transaction that locks its shards,
+    so votes on other choices never wait for the compaction. The questions are
+    touched afterwards, so no cached copy outlives the change of their rows.
+
+    :return: number of choices whose shards were folded
+    """
+    choice_ids = list(ChoiceShard.objects.exclude(count=0).values_list('choice_id', flat=True).distinct())
+    for choice_id in choice_ids:
+        with transaction.atomic():
+            shards = list(ChoiceShard.objects.select_for_update().filter(choice_id=choice_id).exclude(count=0))
+            total = sum(shard.count for shard in shards)
+            ChoiceShard.objects.filter(pk__in=[shard.pk for shard in shards]).update(count=0)
+            Choice.objects.filter(pk=choice_id).update(vote_count=F('vote_count') + total)
+    if choice_ids:
+        Question.objects.filter(pk__in=Choice.objects.filter(pk__in=choice_ids).values('question')).touch()
+    return len(choice_ids)